@@ -7,7 +7,13 @@ import asyncio
 import json
 import re
 import os
+import string
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 import websockets
 from websockets.server import serve
@@ -17,18 +23,78 @@ import emoji
 
 # Configuration
 WEBSOCKET_PORT = 8765
+DEBUG = os.environ.get("DEBUG", "") not in ("", "0")  # Log inbound client messages
 
 # Ollama configuration (local on Spark)
 OLLAMA_URL = "http://192.168.68.71:11434/api/generate"
 OLLAMA_MODEL = "qwen2.5:3b"
 
-# Connected WebSocket clients
-connected_clients = set()
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Optional - stdlib json is used instead
+
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+
+def json_bytes(obj) -> bytes:
+    """Serialize to UTF-8 JSON bytes (request bodies)"""
+    return orjson.dumps(obj) if orjson else json.dumps(obj).encode()
+
+
+def json_text(obj) -> str:
+    """Serialize to a JSON string (WebSocket text frames)"""
+    return orjson.dumps(obj).decode() if orjson else json.dumps(obj)
+
+
+def json_parse(data):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+# Shared HTTP client so Ollama calls reuse keep-alive connections
+# Per-call timeouts are passed to post(); closed in main()
+ollama_client = httpx.AsyncClient(
+    timeout=10.0,
+    limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60),
+)
+
+# Connected WebSocket clients -> queue of outgoing JSON-encoded messages
+# Each queue is drained by a relay_to_client task
+connected_clients = {}
+CLIENT_QUEUE_SIZE = 256  # Messages buffered per client before dropping
+MAX_FRAME_MESSAGES = 50  # Messages coalesced into one WebSocket frame
 
 # Chat Pulse configuration
 PULSE_INTERVAL = 120  # Generate summary every 2 minutes
 PULSE_MESSAGE_WINDOW = 100  # Messages to consider for summary
-pulse_message_buffer = []  # Rolling buffer of recent messages
+pulse_message_buffer = deque(maxlen=PULSE_MESSAGE_WINDOW)  # Rolling buffer of recent messages
+
+# ============== MESSAGE CONTEXT ==============
+
+WORD_RE = re.compile(r'\w+')
+MSG_CACHE_SIZE = 4096  # Distinct texts memoized (chat repeats a lot: copypasta, "LOL", spam bursts)
+
+
+@dataclass(frozen=True)
+class MsgCtx:
+    """Per-message views shared by the classifiers, computed once"""
+    raw: str
+    lower: str
+    upper: str
+    words: frozenset
+    categories: frozenset  # Pattern categories from match_categories()
+
+
+@lru_cache(maxsize=MSG_CACHE_SIZE)
+def build_msg_ctx(text: str) -> MsgCtx:
+    text_lower = text.lower()
+    return MsgCtx(
+        raw=text,
+        lower=text_lower,
+        upper=text.upper(),
+        words=frozenset(WORD_RE.findall(text_lower)),
+        categories=frozenset(match_categories(text_lower)),
+    )
 
 # ============== TICKER DETECTION ==============
 
@@ -178,7 +244,7 @@ KNOWN_TICKERS = {
 }
 
 # Words that look like tickers but AREN'T
-IGNORE_WORDS = {
+IGNORE_WORDS = frozenset({
     # Common words that are real tickers nobody means in chat
     'ALL', 'ARE', 'BIG', 'BUY', 'CAN', 'CEO', 'DAY', 'DID', 'EOD', 'FOR',
     'GET', 'GOT', 'HAS', 'HER', 'HIM', 'HIS', 'HOW', 'ITS', 'LET', 'LOT',
@@ -214,13 +280,15 @@ IGNORE_WORDS = {
     'LUCK', 'MAIN', 'NICE', 'OPEN', 'PAID', 'PLAY', 'POOR', 'RISK', 'SAFE',
     'SICK', 'SURE', 'TALK', 'WAIT', 'WALK', 'WILD', 'WISE', 'GUYS', 'NUTS',
     'KINDA', 'ELON',  # Specific to chat
-}
+})
 
 # Track tickers discovered via $ prefix this session
 session_discovered = set()
+# KNOWN_TICKERS plus session_discovered, kept up to date so it's never rebuilt per message
+KNOWN_TICKERS_LIVE = set(KNOWN_TICKERS)
 
 # Tickers that are also common words - require $ or stock context
-AMBIGUOUS_TICKERS = {
+AMBIGUOUS_TICKERS = frozenset({
     # Common 3-letter words that are tickers
     'ALL', 'ARE', 'BIG', 'CAN', 'CAR', 'DAY', 'FUN', 'FOR', 'GAS', 'GOT',
     'HAS', 'HIT', 'HOT', 'KEY', 'LOW', 'MAN', 'MEN', 'NET', 'NOW', 'OLD',
@@ -252,11 +320,11 @@ AMBIGUOUS_TICKERS = {
     'HEAR',  # Turtle Beach - but "hear" is common
     'DISH',  # Dish Network - but "dish" is common
     'TRIP',  # TripAdvisor - but "trip" is common  
-}
+})
 
 # Tickers that are EXTREMELY common words - require $ prefix ONLY
 # These are so common that even stock context isn't reliable
-DOLLAR_ONLY_TICKERS = {
+DOLLAR_ONLY_TICKERS = frozenset({
     # 2-letter words - way too common
     'DO', 'GO', 'ON', 'SO', 'IT', 'AT', 'BE', 'BY', 'OR', 'AN', 'AS', 'IF',
     'NO', 'UP', 'WE', 'HE', 'ME', 'TV',
@@ -266,10 +334,10 @@ DOLLAR_ONLY_TICKERS = {
     'KO',  # Coca-Cola but also "knockout", "KO'd"
     'CAT',  # Caterpillar but "cat" is very common
     'DOG',  # Not a ticker but similar pattern
-}
+})
 
 # Words that indicate stock context
-STOCK_CONTEXT_WORDS = {
+STOCK_CONTEXT_WORDS = frozenset({
     'buy', 'buying', 'bought', 'sell', 'selling', 'sold', 'calls', 'call',
     'puts', 'put', 'shares', 'stock', 'stocks', 'price', 'trading', 'trade',
     'long', 'short', 'bullish', 'bearish', 'options', 'option', 'squeeze',
@@ -287,57 +355,124 @@ STOCK_CONTEXT_WORDS = {
     'upgrade', 'downgrade', 'analyst', 'pt', 'rating', 'sector', 'etf',
     'rally', 'crash', 'correction', 'pullback', 'consolidation', 'channel',
     'ticker', 'symbol', 'stonk', 'stonks', 'invest', 'investing', 'investor',
-}
+})
+
+# Bit flags so one dict lookup answers all three ticker filter sets
+IGNORE_FLAG = 1
+DOLLAR_ONLY_FLAG = 2
+AMBIGUOUS_FLAG = 4
+SKIP_FLAGS = IGNORE_FLAG | DOLLAR_ONLY_FLAG  # Never a bare ticker
+
+
+def _build_word_flags() -> dict:
+    flags = {}
+    for words, flag in ((IGNORE_WORDS, IGNORE_FLAG),
+                        (DOLLAR_ONLY_TICKERS, DOLLAR_ONLY_FLAG),
+                        (AMBIGUOUS_TICKERS, AMBIGUOUS_FLAG)):
+        for word in words:
+            flags[word] = flags.get(word, 0) | flag
+    return flags
+
+
+WORD_FLAGS = _build_word_flags()
+
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None  # Optional - regex alternations are used instead
 
-def has_stock_context(text: str) -> bool:
+
+def _build_company_automaton():
+    """Aho-Corasick automaton over COMPANY_NAMES -> (priority, name length, ticker)"""
+    automaton = ahocorasick.Automaton()
+    for priority, (name, ticker) in enumerate(COMPANY_NAMES.items()):
+        automaton.add_word(name, (priority, len(name), ticker))
+    automaton.make_automaton()
+    return automaton
+
+
+COMPANY_AUTOMATON = _build_company_automaton() if ahocorasick else None
+
+# Fallback when pyahocorasick is missing: one alternation regex for all names
+COMPANY_NAME_RE = re.compile(r'\b(' + '|'.join(map(re.escape, COMPANY_NAMES)) + r')\b')
+COMPANY_PRIORITY = {name: priority for priority, name in enumerate(COMPANY_NAMES)}
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c == '_'
+
+
+def find_company_ticker(text_upper: str) -> Optional[str]:
+    """Map a whole-word company name in the message to its ticker"""
+    if COMPANY_AUTOMATON is None:
+        names = COMPANY_NAME_RE.findall(text_upper)
+        if not names:
+            return None
+        return COMPANY_NAMES[min(names, key=COMPANY_PRIORITY.__getitem__)]
+    
+    # Single pass over the text; on multiple hits COMPANY_NAMES order wins
+    best = None
+    for end, (priority, length, ticker) in COMPANY_AUTOMATON.iter(text_upper):
+        start = end - length + 1
+        if start > 0 and _is_word_char(text_upper[start - 1]):
+            continue
+        if end + 1 < len(text_upper) and _is_word_char(text_upper[end + 1]):
+            continue
+        if best is None or priority < best[0]:
+            best = (priority, ticker)
+    return best[1] if best else None
+
+
+DOLLAR_TICKER_RE = re.compile(r'\$([A-Z]{1,5})\b')
+TICKER_CANDIDATE_RE = re.compile(r'\b([A-Z]{2,5})\b')
+
+
+def has_stock_context(ctx: MsgCtx) -> bool:
     """Check if message has stock-related context words"""
-    text_lower = text.lower()
-    words = set(re.findall(r'\w+', text_lower))
-    return bool(words & STOCK_CONTEXT_WORDS)
+    return not ctx.words.isdisjoint(STOCK_CONTEXT_WORDS)
 
 
-def extract_ticker(text: str) -> Optional[str]:
+def extract_ticker(ctx: MsgCtx) -> Optional[str]:
     """Extract ticker from text - context-aware approach"""
-    text_upper = text.upper()
+    text_upper = ctx.upper
     
     # 1. $TICKER format - always trust it (highest priority)
-    dollar_match = re.search(r'\$([A-Z]{1,5})\b', text_upper)
+    dollar_match = DOLLAR_TICKER_RE.search(text_upper)
     if dollar_match:
         ticker = dollar_match.group(1)
         if ticker not in IGNORE_WORDS:
             session_discovered.add(ticker)
+            KNOWN_TICKERS_LIVE.add(ticker)
             return ticker
     
     # 2. Company name mapping - always trust
-    for name, ticker in COMPANY_NAMES.items():
-        if re.search(r'\b' + name + r'\b', text_upper):
-            return ticker
+    company_ticker = find_company_ticker(text_upper)
+    if company_ticker:
+        return company_ticker
     
     # 3. Find all potential tickers in message
-    all_valid = KNOWN_TICKERS | session_discovered
-    words = re.findall(r'\b([A-Z]{2,5})\b', text_upper)
+    all_valid = KNOWN_TICKERS_LIVE
+    words = TICKER_CANDIDATE_RE.findall(text_upper)
     
     # First pass: look for UNAMBIGUOUS tickers (priority)
     # Skip both AMBIGUOUS_TICKERS and DOLLAR_ONLY_TICKERS
     for word in words:
-        if word in IGNORE_WORDS:
-            continue
-        if word in DOLLAR_ONLY_TICKERS:
-            continue  # These ONLY work with $ prefix
-        if word in all_valid and word not in AMBIGUOUS_TICKERS:
+        flags = WORD_FLAGS.get(word, 0)
+        if flags & SKIP_FLAGS:
+            continue  # Ignored words, and DOLLAR_ONLY tickers which ONLY work with $ prefix
+        if not flags & AMBIGUOUS_FLAG and word in all_valid:
             return word
     
     # Second pass: check ambiguous tickers (only if no unambiguous found)
     # Requires stock context words nearby
-    has_context = has_stock_context(text)
+    has_context = has_stock_context(ctx)
     if has_context:
         for word in words:
-            if word in IGNORE_WORDS:
-                continue
-            if word in DOLLAR_ONLY_TICKERS:
-                continue  # These ONLY work with $ prefix, even with context
-            if word in all_valid and word in AMBIGUOUS_TICKERS:
+            flags = WORD_FLAGS.get(word, 0)
+            if flags & SKIP_FLAGS:
+                continue  # DOLLAR_ONLY tickers need the $ prefix, even with context
+            if flags & AMBIGUOUS_FLAG and word in all_valid:
                 return word
     
     return None
@@ -345,22 +480,31 @@ def extract_ticker(text: str) -> Optional[str]:
 
 # ============== SENTIMENT ==============
 
-BULLISH_WORDS = {
+BULLISH_WORDS = frozenset({
     'buy', 'buying', 'bought', 'long', 'calls', 'call', 'bullish', 'moon',
     'rocket', 'pump', 'breakout', 'rip', 'ripping', 'squeeze', 'green',
     'up', 'higher', 'strong', 'support', 'bounce', 'reversal', 'cheap',
     'dip', 'accumulate', 'load', 'loading', 'ath', 'highs', 'beat',
     'crush', 'smash', 'blast', 'fly', 'flying', 'soar', 'send', 'print',
     'tendies', 'gains', 'bullish', 'lfg', 'letsgoo', 'bullrun', 'parabolic'
-}
+})
 
-BEARISH_WORDS = {
+BEARISH_WORDS = frozenset({
     'sell', 'selling', 'sold', 'short', 'puts', 'put', 'bearish', 'dump',
     'dumping', 'crash', 'crashing', 'tank', 'tanking', 'drill', 'drilling',
     'red', 'down', 'lower', 'weak', 'resistance', 'rejection', 'fade',
     'overvalued', 'expensive', 'bubble', 'top', 'topped', 'rug', 'rugged',
     'rekt', 'trapped', 'baghold', 'bagholder', 'dead', 'cliff', 'sink',
     'capitulate', 'capitulation', 'bloodbath', 'slaughter'
+})
+
+# Single intersection against this narrows a message's words to sentiment hits
+SENTIMENT_WORDS = BULLISH_WORDS | BEARISH_WORDS
+
+# Emoji -> sentiment; any hit adds 2 to that side (once, not per emoji)
+SENTIMENT_EMOJIS = {
+    '🚀': 'bullish', '📈': 'bullish', '💚': 'bullish', '🟢': 'bullish', '🔥': 'bullish',
+    '📉': 'bearish', '💔': 'bearish', '🔴': 'bearish', '🩸': 'bearish', '💀': 'bearish',
 }
 
 # Question detection patterns - smarter heuristics
@@ -378,16 +522,28 @@ QUESTION_PATTERNS = [
     r'\btarget\s*(price)?\b.*\bfor\b',                 # "target price for"
     r'\bpt\b.*\bfor\b',                                 # "PT for NVDA"
 ]
-QUESTION_PATTERN = re.compile('|'.join(QUESTION_PATTERNS), re.IGNORECASE)
+QUESTION_PATTERN = re.compile('|'.join(QUESTION_PATTERNS))
 
 
 # ============== SPAM DETECTION ==============
 
 # User message history for duplicate/rate detection
-# Structure: {author: [(timestamp, text_hash), ...]}
-user_message_history = {}
+# Structure: {author: deque([(timestamp, text_hash), ...])}
 HISTORY_WINDOW = 60  # seconds to keep history
 MAX_HISTORY_PER_USER = 20
+SPAM_CERTAIN_CONFIDENCE = 0.95  # Stop checking once a message is this clearly spam
+REPEATED_CHAR_RE = re.compile(r'(.)\1{4,}')  # 5+ of same char in a row
+user_message_history = defaultdict(lambda: deque(maxlen=MAX_HISTORY_PER_USER))
+# {author: Counter(text_hash)} mirroring the deque, for O(1) duplicate checks
+user_hash_counts = defaultdict(Counter)
+
+try:
+    import xxhash
+    
+    def text_fingerprint(text: str) -> int:
+        return xxhash.xxh3_64_intdigest(text.encode('utf-8', 'surrogatepass'))
+except ImportError:
+    text_fingerprint = hash  # Optional - Python's string hash works, just slower
 
 # Spam link patterns
 SPAM_LINK_PATTERNS = [
@@ -397,7 +553,7 @@ SPAM_LINK_PATTERNS = [
     r'click.*link', r'check.*bio', r'link.*bio',
     r'dm.*me', r'dm.*for', r'message.*me',
 ]
-SPAM_LINK_RE = re.compile('|'.join(SPAM_LINK_PATTERNS), re.IGNORECASE)
+SPAM_LINK_RE = re.compile('|'.join(SPAM_LINK_PATTERNS))
 
 # Pump/promo phrases
 SPAM_PUMP_PHRASES = [
@@ -414,7 +570,7 @@ SPAM_PUMP_PHRASES = [
     r'secret.*strategy', r'they.*dont.*want',
     r'subscribe.*my', r'follow.*my', r'check.*my.*channel',
 ]
-SPAM_PUMP_RE = re.compile('|'.join(SPAM_PUMP_PHRASES), re.IGNORECASE)
+SPAM_PUMP_RE = re.compile('|'.join(SPAM_PUMP_PHRASES))
 
 # Crypto scam patterns
 SPAM_CRYPTO_SCAM = [
@@ -423,90 +579,184 @@ SPAM_CRYPTO_SCAM = [
     r'validate.*wallet', r'sync.*wallet',
     r'claim.*reward', r'claim.*token', r'claim.*airdrop',
 ]
-SPAM_CRYPTO_RE = re.compile('|'.join(SPAM_CRYPTO_SCAM), re.IGNORECASE)
+SPAM_CRYPTO_RE = re.compile('|'.join(SPAM_CRYPTO_SCAM))
+
+
+# ============== MULTI-PATTERN SCAN ==============
+
+# Pattern categories checked on every message. With google-re2 installed all of
+# them are compiled into one RE2::Set and matched in a single linear pass;
+# otherwise each category falls back to its compiled `re` pattern above.
+# All patterns are lowercase and run case-sensitively against the lowercased
+# message, which is cheaper than case-insensitive matching.
+PATTERN_CATEGORIES = {
+    'question': QUESTION_PATTERNS,
+    'promo_link': SPAM_LINK_PATTERNS,
+    'pump_promo': SPAM_PUMP_PHRASES,
+    'crypto_scam': SPAM_CRYPTO_SCAM,
+}
+CATEGORY_REGEXES = {
+    'question': QUESTION_PATTERN,
+    'promo_link': SPAM_LINK_RE,
+    'pump_promo': SPAM_PUMP_RE,
+    'crypto_scam': SPAM_CRYPTO_RE,
+}
+
+try:
+    import re2
+except ImportError:
+    re2 = None  # Optional - per-category regex scan is used instead
+
+
+def _build_pattern_set():
+    """
+    Compile every category pattern into one RE2 set.
+    Returns: (pattern_set, category name for each pattern index)
+    """
+    # Note: RE2 word boundaries are ASCII-only, unlike Python's `re`
+    pattern_set = re2.Set.SearchSet(re2.Options())
+    pattern_categories = []
+    for name, patterns in PATTERN_CATEGORIES.items():
+        for pattern in patterns:
+            pattern_set.Add(pattern)
+            pattern_categories.append(name)
+    pattern_set.Compile()
+    return pattern_set, pattern_categories
+
+
+PATTERN_SET, PATTERN_SET_CATEGORIES = _build_pattern_set() if re2 else (None, None)
+
+
+def match_categories(text_lower: str) -> set:
+    """Return the names of all PATTERN_CATEGORIES that match the lowercased message"""
+    if PATTERN_SET is None:
+        return {name for name, regex in CATEGORY_REGEXES.items() if regex.search(text_lower)}
+    return {PATTERN_SET_CATEGORIES[i] for i in PATTERN_SET.Match(text_lower) or ()}
+
+
+_ASCII_LETTERS = string.ascii_letters.encode()
+_ASCII_UPPERCASE = string.ascii_uppercase.encode()
+
+
+def count_alpha_upper(text: str) -> tuple:
+    """Return (letters, uppercase letters) in one pass over text"""
+    if text.isascii():
+        # Most chat is ASCII: let bytes.translate do the counting in C
+        raw = text.encode('ascii')
+        alpha = len(raw) - len(raw.translate(None, _ASCII_LETTERS))
+        upper = len(raw) - len(raw.translate(None, _ASCII_UPPERCASE))
+        return alpha, upper
+    alpha = upper = 0
+    for c in text:
+        if c.isalpha():
+            alpha += 1
+            if c.isupper():
+                upper += 1
+    return alpha, upper
 
 
 def clean_history(author: str, current_time: float):
-    """Remove old entries from user history"""
-    if author in user_message_history:
-        user_message_history[author] = [
-            (ts, h) for ts, h in user_message_history[author]
-            if current_time - ts < HISTORY_WINDOW
-        ][-MAX_HISTORY_PER_USER:]
+    """Remove old entries from user history (current_time is time.monotonic())"""
+    history = user_message_history.get(author)
+    # Entries are appended in time order, so expired ones are always at the left
+    while history and current_time - history[0][0] >= HISTORY_WINDOW:
+        forget_hash(author, history.popleft()[1])
 
 
-def detect_spam(text: str, author: str) -> dict:
+def forget_hash(author: str, text_hash: int):
+    counts = user_hash_counts[author]
+    counts[text_hash] -= 1
+    if counts[text_hash] <= 0:
+        del counts[text_hash]
+
+
+def detect_spam(ctx: MsgCtx, author: str) -> dict:
     """
     Detect spam using rule-based heuristics.
     Returns: {'is_spam': bool, 'reason': str or None, 'confidence': float}
     """
-    current_time = datetime.now().timestamp()
+    text = ctx.raw
+    categories = ctx.categories
+    
+    current_time = time.monotonic()
     clean_history(author, current_time)
     
-    text_lower = text.lower()
-    text_hash = hash(text_lower.strip())
+    text_hash = text_fingerprint(ctx.lower.strip())
     reasons = []
     confidence = 0.0
     
+    history = user_message_history[author]
+    hash_counts = user_hash_counts[author]
+    
     # 1. Duplicate message detection (same user, same text)
-    if author in user_message_history:
-        recent_hashes = [h for _, h in user_message_history[author]]
-        if text_hash in recent_hashes:
-            reasons.append('duplicate')
-            confidence = max(confidence, 0.9)
+    if text_hash in hash_counts:
+        reasons.append('duplicate')
+        confidence = max(confidence, 0.9)
     
     # 2. Rapid-fire detection (>3 messages in 10 seconds)
-    if author in user_message_history:
-        recent_timestamps = [ts for ts, _ in user_message_history[author]]
-        recent_10s = [ts for ts in recent_timestamps if current_time - ts < 10]
-        if len(recent_10s) >= 3:
-            reasons.append('rapid_fire')
-            confidence = max(confidence, 0.8)
+    recent_10s = sum(1 for ts, _ in history if current_time - ts < 10)
+    if recent_10s >= 3:
+        reasons.append('rapid_fire')
+        confidence = max(confidence, 0.8)
+    
+    # Store in history (deque maxlen drops the oldest entry)
+    if len(history) == history.maxlen:
+        forget_hash(author, history[0][1])
+    history.append((current_time, text_hash))
+    hash_counts[text_hash] += 1
     
     # 3. Link spam
-    if SPAM_LINK_RE.search(text):
+    if 'promo_link' in categories:
         reasons.append('promo_link')
         confidence = max(confidence, 0.85)
     
     # 4. Pump/promo phrases
-    if SPAM_PUMP_RE.search(text):
+    if 'pump_promo' in categories:
         reasons.append('pump_promo')
         confidence = max(confidence, 0.8)
     
     # 5. Crypto scam patterns
-    if SPAM_CRYPTO_RE.search(text):
+    if 'crypto_scam' in categories:
         reasons.append('crypto_scam')
         confidence = max(confidence, 0.95)
     
+    # Already certain - the weak heuristics below can't change the verdict
+    if confidence >= SPAM_CERTAIN_CONFIDENCE:
+        return spam_verdict(reasons, confidence)
+    
     # 6. Excessive caps (>70% caps, min 10 chars)
-    alpha_chars = [c for c in text if c.isalpha()]
-    if len(alpha_chars) >= 10:
-        caps_ratio = sum(1 for c in alpha_chars if c.isupper()) / len(alpha_chars)
+    alpha_count, upper_count = count_alpha_upper(text)
+    if alpha_count >= 10:
+        caps_ratio = upper_count / alpha_count
         if caps_ratio > 0.7:
             reasons.append('excessive_caps')
             confidence = max(confidence, 0.5)  # Lower confidence, caps alone isn't definitive
     
     # 7. Repetitive characters (e.g., "BUYYYYYYY" or "🚀🚀🚀🚀🚀🚀🚀🚀")
     # 5+ of same char in a row
-    if re.search(r'(.)\1{4,}', text):
+    if REPEATED_CHAR_RE.search(text):
         reasons.append('repetitive_chars')
         confidence = max(confidence, 0.4)  # Low confidence alone
     
-    # 8. Excessive emojis (>10 emojis)
-    emoji_count = len([c for c in text if c in emoji.EMOJI_DATA])
+    # 8. Excessive emojis (>10 emojis) - stop counting once over the limit
+    emoji_count = 0
+    for c in text:
+        if c in emoji.EMOJI_DATA:
+            emoji_count += 1
+            if emoji_count > 10:
+                break
     if emoji_count > 10:
         reasons.append('excessive_emojis')
         confidence = max(confidence, 0.5)
     
-    # Store in history
-    if author not in user_message_history:
-        user_message_history[author] = []
-    user_message_history[author].append((current_time, text_hash))
-    
     # Combine weak signals
     if len(reasons) >= 2 and confidence < 0.7:
         confidence = min(0.75, confidence + 0.2)
     
+    return spam_verdict(reasons, confidence)
+
+
+def spam_verdict(reasons: list, confidence: float) -> dict:
     is_spam = confidence >= 0.7
     
     return {
@@ -527,15 +777,14 @@ Message: "{text}"
 Reply with ONLY: yes or no"""
     
     try:
-        async with httpx.AsyncClient(timeout=3.0) as client:
-            response = await client.post(OLLAMA_URL, json={
-                "model": OLLAMA_MODEL,
-                "prompt": prompt,
-                "stream": False,
-                "options": {"temperature": 0}
-            })
-            result = response.json()["response"].strip().lower()
-            return "yes" in result
+        response = await ollama_client.post(OLLAMA_URL, headers=JSON_HEADERS, content=json_bytes({
+            "model": OLLAMA_MODEL,
+            "prompt": prompt,
+            "stream": False,
+            "options": {"temperature": 0}
+        }), timeout=3.0)
+        result = json_parse(response.content)["response"].strip().lower()
+        return "yes" in result
     except Exception as e:
         print(f"LLM spam check error: {e}")
         return False
@@ -543,7 +792,7 @@ Reply with ONLY: yes or no"""
 
 # ============== CHAT PULSE SUMMARIES ==============
 
-async def generate_pulse_summary(messages: list) -> dict:
+async def generate_pulse_summary(messages) -> dict:
     """
     Generate a brief summary of recent chat activity.
     Returns: {'mood': str, 'topics': str, 'vibe': str, 'highlight': str}
@@ -551,19 +800,21 @@ async def generate_pulse_summary(messages: list) -> dict:
     if not messages:
         return None
     
-    # Build context from messages
-    texts = [m['text'] for m in messages[-PULSE_MESSAGE_WINDOW:]]
-    tickers = [m['topic'] for m in messages if m.get('topic')]
-    sentiments = [m['sentiment'] for m in messages if m.get('sentiment') != 'neutral']
+    # Build context from messages (already bounded to PULSE_MESSAGE_WINDOW)
+    texts, tickers, sentiments = [], [], []
+    for m in messages:
+        texts.append(m['text'])
+        if m.get('topic'):
+            tickers.append(m['topic'])
+        if m.get('sentiment') != 'neutral':
+            sentiments.append(m['sentiment'])
     
     # Count tickers and sentiments
-    ticker_counts = {}
-    for t in tickers:
-        ticker_counts[t] = ticker_counts.get(t, 0) + 1
-    top_tickers = sorted(ticker_counts.items(), key=lambda x: -x[1])[:3]
+    top_tickers = Counter(tickers).most_common(3)
     
-    bullish_count = sentiments.count('bullish')
-    bearish_count = sentiments.count('bearish')
+    sentiment_counts = Counter(sentiments)
+    bullish_count = sentiment_counts['bullish']
+    bearish_count = sentiment_counts['bearish']
     
     # Build prompt
     sample_msgs = "\n".join(texts[-30:])  # Last 30 messages for context
@@ -587,52 +838,52 @@ Write a brief, casual summary like:
 Summary:"""
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(OLLAMA_URL, json={
-                "model": OLLAMA_MODEL,
-                "prompt": prompt,
-                "stream": False,
-                "options": {"temperature": 0.7}  # Slight creativity
-            })
-            summary = response.json()["response"].strip()
-            # Clean up the response
-            summary = summary.replace('"', '').strip()
-            if summary.startswith('-'):
-                summary = summary[1:].strip()
-            # Truncate if too long
-            if len(summary) > 80:
-                summary = summary[:77] + "..."
-            
-            # Determine mood emoji
-            if bullish_count > bearish_count * 2:
-                mood = "🟢"
-            elif bearish_count > bullish_count * 2:
-                mood = "🔴"
-            elif bullish_count > 0 or bearish_count > 0:
-                mood = "🟡"
-            else:
-                mood = "⚪"
-            
-            return {
-                'summary': summary,
-                'mood': mood,
-                'top_ticker': top_tickers[0][0] if top_tickers else None,
-                'msg_count': len(messages),
-                'timestamp': datetime.now().isoformat()
-            }
+        response = await ollama_client.post(OLLAMA_URL, headers=JSON_HEADERS, content=json_bytes({
+            "model": OLLAMA_MODEL,
+            "prompt": prompt,
+            "stream": False,
+            "options": {"temperature": 0.7}  # Slight creativity
+        }), timeout=10.0)
+        summary = json_parse(response.content)["response"].strip()
+        # Clean up the response
+        summary = summary.replace('"', '').strip()
+        if summary.startswith('-'):
+            summary = summary[1:].strip()
+        # Truncate if too long
+        if len(summary) > 80:
+            summary = summary[:77] + "..."
+        
+        # Determine mood emoji
+        if bullish_count > bearish_count * 2:
+            mood = "🟢"
+        elif bearish_count > bullish_count * 2:
+            mood = "🔴"
+        elif bullish_count > 0 or bearish_count > 0:
+            mood = "🟡"
+        else:
+            mood = "⚪"
+        
+        return {
+            'summary': summary,
+            'mood': mood,
+            'top_ticker': top_tickers[0][0] if top_tickers else None,
+            'msg_count': len(messages),
+            'timestamp': datetime.now().isoformat()
+        }
     except Exception as e:
         print(f"Pulse generation error: {e}")
         return None
 
 
-def analyze_sentiment(text: str) -> str:
-    text_lower = text.lower()
-    words = set(re.findall(r'\w+', text_lower))
-    bullish_count = len(words & BULLISH_WORDS)
-    bearish_count = len(words & BEARISH_WORDS)
-    if '🚀' in text or '📈' in text or '💚' in text or '🟢' in text or '🔥' in text:
+def analyze_sentiment(ctx: MsgCtx) -> str:
+    text = ctx.raw
+    hits = ctx.words & SENTIMENT_WORDS
+    bullish_count = len(hits & BULLISH_WORDS) if hits else 0
+    bearish_count = len(hits & BEARISH_WORDS) if hits else 0
+    emoji_sides = {SENTIMENT_EMOJIS[c] for c in text if c in SENTIMENT_EMOJIS}
+    if 'bullish' in emoji_sides:
         bullish_count += 2
-    if '📉' in text or '💔' in text or '🔴' in text or '🩸' in text or '💀' in text:
+    if 'bearish' in emoji_sides:
         bearish_count += 2
     if bullish_count > bearish_count:
         return 'bullish'
@@ -641,307 +892,371 @@ def analyze_sentiment(text: str) -> str:
     return 'neutral'
 
 
-def is_question(text: str) -> bool:
-    return bool(QUESTION_PATTERN.search(text))
+def is_question(ctx: MsgCtx) -> bool:
+    return 'question' in ctx.categories
 
 
 # ============== VIBE CLASSIFICATION ==============
 
-async def classify_vibe_single(text: str) -> Optional[str]:
-    """Classify a single message using local Ollama"""
-    prompt = f"""Classify this YouTube chat message into EXACTLY ONE category:
+VIBE_LINE_RE = re.compile(r'^\s*(\d+)\s*[.):-]\s*\W*(funny|uplifting|none)', re.IGNORECASE | re.MULTILINE)
+
+# Classified texts -> vibe (None for 'none'), oldest first, so repeats skip Ollama
+VIBE_CACHE_SIZE = 1024
+vibe_cache = {}
+
+
+def remember_vibe(text: str, vibe: Optional[str]):
+    vibe_cache[text] = vibe
+    if len(vibe_cache) > VIBE_CACHE_SIZE:
+        del vibe_cache[next(iter(vibe_cache))]
+
+
+async def classify_vibe_many(texts: list) -> list:
+    """
+    Classify several messages with one Ollama request (None where not funny/uplifting).
+    Duplicate texts share one prompt line; previously classified texts come from vibe_cache.
+    """
+    vibes = {text: vibe_cache[text] for text in texts if text in vibe_cache}
+    unique = [text for text in dict.fromkeys(texts) if text not in vibes]
+    if not unique:
+        return [vibes[text] for text in texts]
+    
+    numbered = "\n".join(f'{i}. "{" ".join(t.split())}"' for i, t in enumerate(unique, 1))
+    prompt = f"""Classify each YouTube chat message below into EXACTLY ONE category:
 - funny: jokes, humor, laughter (lmao, haha, 😂, etc.)
 - uplifting: encouragement, positivity, support
 - none: neutral, questions, or anything else
 
-Message: "{text}"
+Messages:
+{numbered}
 
-Reply with ONLY one word: funny, uplifting, or none"""
+Reply with one line per message, formatted as "<number>. <category>", and nothing else"""
     
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.post(OLLAMA_URL, json={
-                "model": OLLAMA_MODEL,
-                "prompt": prompt,
-                "stream": False,
-                "options": {"temperature": 0}
-            })
-            result = response.json()["response"].strip().lower()
-            # Extract classification word
-            for word in ["funny", "uplifting", "none"]:
-                if word in result:
-                    return word if word != "none" else None
+        response = await ollama_client.post(OLLAMA_URL, headers=JSON_HEADERS, content=json_bytes({
+            "model": OLLAMA_MODEL,
+            "prompt": prompt,
+            "stream": False,
+            "options": {"temperature": 0}
+        }), timeout=10.0)
+        result = json_parse(response.content)["response"]
+        for num, word in VIBE_LINE_RE.findall(result):
+            idx = int(num) - 1
+            if 0 <= idx < len(unique):
+                word = word.lower()
+                vibe = word if word != "none" else None
+                vibes[unique[idx]] = vibe
+                remember_vibe(unique[idx], vibe)  # Only cache real answers, not failures
     except Exception as e:
         print(f"Ollama classification error: {e}")
-    return None
+    return [vibes.get(text) for text in texts]
 
 
 async def classify_vibe_batch(messages: list) -> list:
-    """Classify messages using local Ollama (processes in parallel)"""
+    """Classify messages using local Ollama (one request for up to 10 messages)"""
     if not messages:
         return messages
     
-    # Process up to 10 messages concurrently
-    tasks = [classify_vibe_single(msg['text']) for msg in messages[:10]]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    batch = messages[:10]
+    results = await classify_vibe_many([msg['text'] for msg in batch])
     
-    for i, (msg, vibe) in enumerate(zip(messages[:10], results)):
-        if isinstance(vibe, str) and vibe in ('funny', 'uplifting'):
+    for msg, vibe in zip(batch, results):
+        if vibe in ('funny', 'uplifting'):
             msg['vibe'] = vibe
     
     return messages
 
 
+# YouTube-specific emoji mapping (covers most common ones)
+YT_MAP = {
+    # Faces - laughing/happy
+    ':rolling_on_floor_laughing:': '🤣',
+    ':face_with_tears_of_joy:': '😂',
+    ':grinning_face:': '😀',
+    ':grinning_face_with_big_eyes:': '😃',
+    ':grinning_face_with_smiling_eyes:': '😄',
+    ':beaming_face_with_smiling_eyes:': '😁',
+    ':grinning_squinting_face:': '😆',
+    ':smiling_face_with_halo:': '😇',
+    ':slightly_smiling_face:': '🙂',
+    ':upside_down_face:': '🙃',
+    ':winking_face:': '😉',
+    ':relieved_face:': '😌',
+    ':smiling_face_with_heart_eyes:': '😍',
+    ':smiling_face_with_hearts:': '🥰',
+    ':face_blowing_a_kiss:': '😘',
+    ':kissing_face:': '😗',
+    ':kissing_face_with_closed_eyes:': '😚',
+    ':kissing_face_with_smiling_eyes:': '😙',
+    ':star_struck:': '🤩',
+    ':partying_face:': '🥳',
+    ':smiling_face_with_sunglasses:': '😎',
+    ':nerd_face:': '🤓',
+    ':face_with_monocle:': '🧐',
+    # Faces - thinking/neutral
+    ':thinking_face:': '🤔',
+    ':thinking:': '🤔',
+    ':face_with_raised_eyebrow:': '🤨',
+    ':neutral_face:': '😐',
+    ':expressionless_face:': '😑',
+    ':face_without_mouth:': '😶',
+    ':face_with_rolling_eyes:': '🙄',
+    ':smirking_face:': '😏',
+    ':persevering_face:': '😣',
+    ':confused_face:': '😕',
+    ':worried_face:': '😟',
+    ':slightly_frowning_face:': '🙁',
+    ':frowning_face:': '☹️',
+    # Faces - sad/crying
+    ':loudly_crying_face:': '😭',
+    ':crying_face:': '😢',
+    ':disappointed_face:': '😞',
+    ':sad_but_relieved_face:': '😥',
+    ':pleading_face:': '🥺',
+    # Faces - angry/negative
+    ':angry_face:': '😠',
+    ':pouting_face:': '😡',
+    ':face_with_symbols_on_mouth:': '🤬',
+    ':skull:': '💀',
+    ':skull_and_crossbones:': '☠️',
+    # Faces - sick/tired
+    ':hot_face:': '🥵',
+    ':cold_face:': '🥶',
+    ':woozy_face:': '🥴',
+    ':dizzy_face:': '😵',
+    ':face_with_spiral_eyes:': '😵‍💫',
+    ':exploding_head:': '🤯',
+    ':face_vomiting:': '🤮',
+    ':sneezing_face:': '🤧',
+    ':sleeping_face:': '😴',
+    ':sleepy_face:': '😪',
+    ':drooling_face:': '🤤',
+    # Faces - misc
+    ':zany_face:': '🤪',
+    ':shushing_face:': '🤫',
+    ':lying_face:': '🤥',
+    ':grimacing_face:': '😬',
+    ':anxious_face_with_sweat:': '😰',
+    ':face_screaming_in_fear:': '😱',
+    ':fearful_face:': '😨',
+    ':astonished_face:': '😲',
+    ':flushed_face:': '😳',
+    ':clown_face:': '🤡',
+    ':clown:': '🤡',
+    ':pile_of_poo:': '💩',
+    ':poop:': '💩',
+    # Gestures/hands
+    ':thumbs_up:': '👍',
+    ':thumbsup:': '👍',
+    ':+1:': '👍',
+    ':thumbs_down:': '👎',
+    ':thumbsdown:': '👎',
+    ':-1:': '👎',
+    ':raised_hands:': '🙌',
+    ':clapping_hands:': '👏',
+    ':folded_hands:': '🙏',
+    ':pray:': '🙏',
+    ':handshake:': '🤝',
+    ':ok_hand:': '👌',
+    ':victory_hand:': '✌️',
+    ':crossed_fingers:': '🤞',
+    ':love_you_gesture:': '🤟',
+    ':sign_of_the_horns:': '🤘',
+    ':call_me_hand:': '🤙',
+    ':backhand_index_pointing_left:': '👈',
+    ':backhand_index_pointing_right:': '👉',
+    ':backhand_index_pointing_up:': '👆',
+    ':backhand_index_pointing_down:': '👇',
+    ':middle_finger:': '🖕',
+    ':raised_fist:': '✊',
+    ':oncoming_fist:': '👊',
+    ':flexed_biceps:': '💪',
+    ':muscle:': '💪',
+    ':writing_hand:': '✍️',
+    ':eyes:': '👀',
+    ':eye:': '👁️',
+    ':brain:': '🧠',
+    # Hearts/love
+    ':red_heart:': '❤️',
+    ':heart:': '❤️',
+    ':orange_heart:': '🧡',
+    ':yellow_heart:': '💛',
+    ':green_heart:': '💚',
+    ':blue_heart:': '💙',
+    ':purple_heart:': '💜',
+    ':black_heart:': '🖤',
+    ':white_heart:': '🤍',
+    ':broken_heart:': '💔',
+    ':sparkling_heart:': '💖',
+    ':heart_on_fire:': '❤️‍🔥',
+    ':two_hearts:': '💕',
+    ':revolving_hearts:': '💞',
+    ':heartbeat:': '💓',
+    ':heartpulse:': '💗',
+    ':growing_heart:': '💗',
+    ':heart_exclamation:': '❣️',
+    # Symbols/misc
+    ':fire:': '🔥',
+    ':flame:': '🔥',
+    ':sparkles:': '✨',
+    ':star:': '⭐',
+    ':glowing_star:': '🌟',
+    ':dizzy:': '💫',
+    ':collision:': '💥',
+    ':boom:': '💥',
+    ':lightning:': '⚡',
+    ':zap:': '⚡',
+    ':high_voltage:': '⚡',
+    ':snowflake:': '❄️',
+    ':cloud:': '☁️',
+    ':sun:': '☀️',
+    ':sunny:': '☀️',
+    ':rainbow:': '🌈',
+    ':moon:': '🌙',
+    ':full_moon:': '🌕',
+    ':new_moon_face:': '🌚',
+    ':full_moon_face:': '🌝',
+    ':hundred_points:': '💯',
+    ':100:': '💯',
+    ':check_mark:': '✔️',
+    ':check_mark_button:': '✅',
+    ':cross_mark:': '❌',
+    ':x:': '❌',
+    ':warning:': '⚠️',
+    ':no_entry:': '⛔',
+    ':exclamation:': '❗',
+    ':question:': '❓',
+    ':red_question_mark:': '❓',
+    # Objects - money
+    ':money_bag:': '💰',
+    ':moneybag:': '💰',
+    ':money_with_wings:': '💸',
+    ':dollar:': '💵',
+    ':dollar_banknote:': '💵',
+    ':yen_banknote:': '💴',
+    ':euro_banknote:': '💶',
+    ':pound_banknote:': '💷',
+    ':gem:': '💎',
+    ':gem_stone:': '💎',
+    ':coin:': '🪙',
+    ':chart_increasing:': '📈',
+    ':chart_decreasing:': '📉',
+    # Objects - misc
+    ':rocket:': '🚀',
+    ':airplane:': '✈️',
+    ':red_circle:': '🔴',
+    ':orange_circle:': '🟠',
+    ':yellow_circle:': '🟡',
+    ':green_circle:': '🟢',
+    ':blue_circle:': '🔵',
+    ':purple_circle:': '🟣',
+    ':white_circle:': '⚪',
+    ':black_circle:': '⚫',
+    ':trophy:': '🏆',
+    ':medal:': '🏅',
+    ':crown:': '👑',
+    ':bell:': '🔔',
+    ':megaphone:': '📣',
+    ':loudspeaker:': '📢',
+    # Animals
+    ':bear:': '🐻',
+    ':bear_face:': '🐻',
+    ':bull:': '🐂',
+    ':ox:': '🐂',
+    ':cow_face:': '🐮',
+    ':cow:': '🐄',
+    ':gorilla:': '🦍',
+    ':ape:': '🦍',
+    ':monkey:': '🐒',
+    ':monkey_face:': '🐵',
+    ':dog:': '🐕',
+    ':dog_face:': '🐶',
+    ':cat:': '🐈',
+    ':cat_face:': '🐱',
+    ':unicorn:': '🦄',
+    ':unicorn_face:': '🦄',
+    ':dragon:': '🐉',
+    ':dragon_face:': '🐲',
+    ':snake:': '🐍',
+    ':eagle:': '🦅',
+    ':shark:': '🦈',
+    ':whale:': '🐋',
+    ':dolphin:': '🐬',
+    ':turtle:': '🐢',
+    ':frog:': '🐸',
+    ':frog_face:': '🐸',
+    ':butterfly:': '🦋',
+    ':bee:': '🐝',
+    ':honeybee:': '🐝',
+    # Food/drink
+    ':beer:': '🍺',
+    ':beers:': '🍻',
+    ':wine_glass:': '🍷',
+    ':cocktail:': '🍸',
+    ':champagne:': '🍾',
+    ':coffee:': '☕',
+    ':popcorn:': '🍿',
+    ':pizza:': '🍕',
+    ':hamburger:': '🍔',
+    ':taco:': '🌮',
+    ':hot_dog:': '🌭',
+}
+
+
+def _build_emoji_automaton():
+    """Aho-Corasick automaton over YT_MAP codes -> emoji"""
+    automaton = ahocorasick.Automaton()
+    for code, emj in YT_MAP.items():
+        automaton.add_word(code, (len(code), emj))
+    automaton.make_automaton()
+    return automaton
+
+
+YT_EMOJI_AUTOMATON = _build_emoji_automaton() if ahocorasick else None
+
+COLON_CODE_RE = re.compile(r'(:[a-z_]+:)')
+
+# Fallback when pyahocorasick is missing: one alternation over every code,
+# longest first so prefixes can't shadow longer codes
+YT_EMOJI_RE = re.compile('|'.join(map(re.escape, sorted(YT_MAP, key=len, reverse=True))))
+
+
+def replace_yt_codes(text: str) -> str:
+    """Replace every YT_MAP code in one left-to-right pass (leftmost, then longest)"""
+    if YT_EMOJI_AUTOMATON is None:
+        return YT_EMOJI_RE.sub(lambda m: YT_MAP[m.group(0)], text)
+    parts = []
+    pos = 0
+    for end, (length, emj) in YT_EMOJI_AUTOMATON.iter_long(text):
+        parts.append(text[pos:end - length + 1])
+        parts.append(emj)
+        pos = end + 1
+    if not parts:
+        return text
+    parts.append(text[pos:])
+    return ''.join(parts)
+
+
+@lru_cache(maxsize=MSG_CACHE_SIZE)
 def convert_emoji_codes(text: str) -> str:
     """Convert YouTube emoji codes like :rolling_on_floor_laughing: to actual emojis"""
+    # Every code needs an opening and closing colon - most messages have none
+    if text.count(':') < 2:
+        return text
     
-    # YouTube-specific emoji mapping (covers most common ones)
-    yt_emoji_map = {
-        # Faces - laughing/happy
-        ':rolling_on_floor_laughing:': '🤣',
-        ':face_with_tears_of_joy:': '😂',
-        ':grinning_face:': '😀',
-        ':grinning_face_with_big_eyes:': '😃',
-        ':grinning_face_with_smiling_eyes:': '😄',
-        ':beaming_face_with_smiling_eyes:': '😁',
-        ':grinning_squinting_face:': '😆',
-        ':smiling_face_with_halo:': '😇',
-        ':slightly_smiling_face:': '🙂',
-        ':upside_down_face:': '🙃',
-        ':winking_face:': '😉',
-        ':relieved_face:': '😌',
-        ':smiling_face_with_heart_eyes:': '😍',
-        ':smiling_face_with_hearts:': '🥰',
-        ':face_blowing_a_kiss:': '😘',
-        ':kissing_face:': '😗',
-        ':kissing_face_with_closed_eyes:': '😚',
-        ':kissing_face_with_smiling_eyes:': '😙',
-        ':star_struck:': '🤩',
-        ':partying_face:': '🥳',
-        ':smiling_face_with_sunglasses:': '😎',
-        ':nerd_face:': '🤓',
-        ':face_with_monocle:': '🧐',
-        # Faces - thinking/neutral
-        ':thinking_face:': '🤔',
-        ':thinking:': '🤔',
-        ':face_with_raised_eyebrow:': '🤨',
-        ':neutral_face:': '😐',
-        ':expressionless_face:': '😑',
-        ':face_without_mouth:': '😶',
-        ':face_with_rolling_eyes:': '🙄',
-        ':smirking_face:': '😏',
-        ':persevering_face:': '😣',
-        ':confused_face:': '😕',
-        ':worried_face:': '😟',
-        ':slightly_frowning_face:': '🙁',
-        ':frowning_face:': '☹️',
-        # Faces - sad/crying
-        ':loudly_crying_face:': '😭',
-        ':crying_face:': '😢',
-        ':disappointed_face:': '😞',
-        ':sad_but_relieved_face:': '😥',
-        ':pleading_face:': '🥺',
-        # Faces - angry/negative
-        ':angry_face:': '😠',
-        ':pouting_face:': '😡',
-        ':face_with_symbols_on_mouth:': '🤬',
-        ':skull:': '💀',
-        ':skull_and_crossbones:': '☠️',
-        # Faces - sick/tired
-        ':hot_face:': '🥵',
-        ':cold_face:': '🥶',
-        ':woozy_face:': '🥴',
-        ':dizzy_face:': '😵',
-        ':face_with_spiral_eyes:': '😵‍💫',
-        ':exploding_head:': '🤯',
-        ':face_vomiting:': '🤮',
-        ':sneezing_face:': '🤧',
-        ':sleeping_face:': '😴',
-        ':sleepy_face:': '😪',
-        ':drooling_face:': '🤤',
-        # Faces - misc
-        ':zany_face:': '🤪',
-        ':shushing_face:': '🤫',
-        ':lying_face:': '🤥',
-        ':grimacing_face:': '😬',
-        ':anxious_face_with_sweat:': '😰',
-        ':face_screaming_in_fear:': '😱',
-        ':fearful_face:': '😨',
-        ':astonished_face:': '😲',
-        ':flushed_face:': '😳',
-        ':clown_face:': '🤡',
-        ':clown:': '🤡',
-        ':pile_of_poo:': '💩',
-        ':poop:': '💩',
-        # Gestures/hands
-        ':thumbs_up:': '👍',
-        ':thumbsup:': '👍',
-        ':+1:': '👍',
-        ':thumbs_down:': '👎',
-        ':thumbsdown:': '👎',
-        ':-1:': '👎',
-        ':raised_hands:': '🙌',
-        ':clapping_hands:': '👏',
-        ':folded_hands:': '🙏',
-        ':pray:': '🙏',
-        ':handshake:': '🤝',
-        ':ok_hand:': '👌',
-        ':victory_hand:': '✌️',
-        ':crossed_fingers:': '🤞',
-        ':love_you_gesture:': '🤟',
-        ':sign_of_the_horns:': '🤘',
-        ':call_me_hand:': '🤙',
-        ':backhand_index_pointing_left:': '👈',
-        ':backhand_index_pointing_right:': '👉',
-        ':backhand_index_pointing_up:': '👆',
-        ':backhand_index_pointing_down:': '👇',
-        ':middle_finger:': '🖕',
-        ':raised_fist:': '✊',
-        ':oncoming_fist:': '👊',
-        ':flexed_biceps:': '💪',
-        ':muscle:': '💪',
-        ':writing_hand:': '✍️',
-        ':eyes:': '👀',
-        ':eye:': '👁️',
-        ':brain:': '🧠',
-        # Hearts/love
-        ':red_heart:': '❤️',
-        ':heart:': '❤️',
-        ':orange_heart:': '🧡',
-        ':yellow_heart:': '💛',
-        ':green_heart:': '💚',
-        ':blue_heart:': '💙',
-        ':purple_heart:': '💜',
-        ':black_heart:': '🖤',
-        ':white_heart:': '🤍',
-        ':broken_heart:': '💔',
-        ':sparkling_heart:': '💖',
-        ':heart_on_fire:': '❤️‍🔥',
-        ':two_hearts:': '💕',
-        ':revolving_hearts:': '💞',
-        ':heartbeat:': '💓',
-        ':heartpulse:': '💗',
-        ':growing_heart:': '💗',
-        ':heart_exclamation:': '❣️',
-        # Symbols/misc
-        ':fire:': '🔥',
-        ':flame:': '🔥',
-        ':sparkles:': '✨',
-        ':star:': '⭐',
-        ':glowing_star:': '🌟',
-        ':dizzy:': '💫',
-        ':collision:': '💥',
-        ':boom:': '💥',
-        ':lightning:': '⚡',
-        ':zap:': '⚡',
-        ':high_voltage:': '⚡',
-        ':snowflake:': '❄️',
-        ':cloud:': '☁️',
-        ':sun:': '☀️',
-        ':sunny:': '☀️',
-        ':rainbow:': '🌈',
-        ':moon:': '🌙',
-        ':full_moon:': '🌕',
-        ':new_moon_face:': '🌚',
-        ':full_moon_face:': '🌝',
-        ':hundred_points:': '💯',
-        ':100:': '💯',
-        ':check_mark:': '✔️',
-        ':check_mark_button:': '✅',
-        ':cross_mark:': '❌',
-        ':x:': '❌',
-        ':warning:': '⚠️',
-        ':no_entry:': '⛔',
-        ':exclamation:': '❗',
-        ':question:': '❓',
-        ':red_question_mark:': '❓',
-        # Objects - money
-        ':money_bag:': '💰',
-        ':moneybag:': '💰',
-        ':money_with_wings:': '💸',
-        ':dollar:': '💵',
-        ':dollar_banknote:': '💵',
-        ':yen_banknote:': '💴',
-        ':euro_banknote:': '💶',
-        ':pound_banknote:': '💷',
-        ':gem:': '💎',
-        ':gem_stone:': '💎',
-        ':coin:': '🪙',
-        ':chart_increasing:': '📈',
-        ':chart_decreasing:': '📉',
-        # Objects - misc
-        ':rocket:': '🚀',
-        ':airplane:': '✈️',
-        ':red_circle:': '🔴',
-        ':orange_circle:': '🟠',
-        ':yellow_circle:': '🟡',
-        ':green_circle:': '🟢',
-        ':blue_circle:': '🔵',
-        ':purple_circle:': '🟣',
-        ':white_circle:': '⚪',
-        ':black_circle:': '⚫',
-        ':trophy:': '🏆',
-        ':medal:': '🏅',
-        ':crown:': '👑',
-        ':bell:': '🔔',
-        ':megaphone:': '📣',
-        ':loudspeaker:': '📢',
-        # Animals
-        ':bear:': '🐻',
-        ':bear_face:': '🐻',
-        ':bull:': '🐂',
-        ':ox:': '🐂',
-        ':cow_face:': '🐮',
-        ':cow:': '🐄',
-        ':gorilla:': '🦍',
-        ':ape:': '🦍',
-        ':monkey:': '🐒',
-        ':monkey_face:': '🐵',
-        ':dog:': '🐕',
-        ':dog_face:': '🐶',
-        ':cat:': '🐈',
-        ':cat_face:': '🐱',
-        ':unicorn:': '🦄',
-        ':unicorn_face:': '🦄',
-        ':dragon:': '🐉',
-        ':dragon_face:': '🐲',
-        ':snake:': '🐍',
-        ':eagle:': '🦅',
-        ':shark:': '🦈',
-        ':whale:': '🐋',
-        ':dolphin:': '🐬',
-        ':turtle:': '🐢',
-        ':frog:': '🐸',
-        ':frog_face:': '🐸',
-        ':butterfly:': '🦋',
-        ':bee:': '🐝',
-        ':honeybee:': '🐝',
-        # Food/drink
-        ':beer:': '🍺',
-        ':beers:': '🍻',
-        ':wine_glass:': '🍷',
-        ':cocktail:': '🍸',
-        ':champagne:': '🍾',
-        ':coffee:': '☕',
-        ':popcorn:': '🍿',
-        ':pizza:': '🍕',
-        ':hamburger:': '🍔',
-        ':taco:': '🌮',
-        ':hot_dog:': '🌭',
-    }
-    
-    # First apply our manual map
-    for code, emj in yt_emoji_map.items():
-        text = text.replace(code, emj)
+    # First apply our manual map - one scan for every code
+    text = replace_yt_codes(text)
+    if ':' not in text:
+        return text  # Every code was consumed, nothing left for the emoji library
     
     # Then try emoji library for any remaining :code: patterns
-    # Try multiple emoji library formats
-    text = emoji.emojize(text, language='alias')  # :thumbsup: style
-    text = emoji.emojize(text, language='en')     # :thumbs_up: style
+    # The alias table includes every 'en' name, so one pass covers both
+    text = emoji.emojize(text, language='alias')  # :thumbsup: and :thumbs_up: style
+    if text.count(':') < 2:
+        return text
     
     # Fallback: try to catch any remaining :word_word: patterns and convert underscores
-    import re
-    remaining = re.findall(r'(:[a-z_]+:)', text)
+    remaining = COLON_CODE_RE.findall(text)
     for code in remaining:
         # Try without underscores
         alt_code = code.replace('_', '')
@@ -954,59 +1269,201 @@ def convert_emoji_codes(text: str) -> str:
 
 # ============== MESSAGE PROCESSING ==============
 
+# Message timestamps are display-only, so format at most once per second
+_timestamp_second = 0
+_timestamp_iso = ''
+
+
+def message_timestamp() -> str:
+    global _timestamp_second, _timestamp_iso
+    now = int(time.time())
+    if now != _timestamp_second:
+        _timestamp_second = now
+        _timestamp_iso = datetime.fromtimestamp(now).isoformat()
+    return _timestamp_iso
+
+
 def process_message(chat_msg) -> dict:
     text = convert_emoji_codes(chat_msg.message)  # Convert emoji codes to actual emojis
     author = chat_msg.author.name
     
+    # Lowercase/uppercase/word views and the pattern scan, shared by all classifiers
+    ctx = build_msg_ctx(text)
+    
     # Check for spam first
-    spam_result = detect_spam(text, author)
+    spam_result = detect_spam(ctx, author)
     
     result = {
         'text': text,
         'author': author,
-        'timestamp': datetime.now().isoformat(),
-        'topic': extract_ticker(text),
+        'timestamp': message_timestamp(),
+        'topic': extract_ticker(ctx),
         'sentiment': 'neutral',
-        'isQuestion': is_question(text),
+        'isQuestion': is_question(ctx),
         'vibe': None,
         'spam': spam_result
     }
     if result['topic']:
-        result['sentiment'] = analyze_sentiment(text)
+        result['sentiment'] = analyze_sentiment(ctx)
     return result
 
 
 # ============== WEBSOCKET SERVER ==============
 
 async def broadcast(message: dict):
-    if connected_clients:
-        msg_json = json.dumps(message)
-        await asyncio.gather(
-            *[c.send(msg_json) for c in connected_clients],
-            return_exceptions=True
-        )
+    """Queue a message for every client; relay tasks do the actual sends"""
+    if not connected_clients:
+        return
+    payload = json_text(message)  # Encoded once, shared by every client
+    for queue in connected_clients.values():
+        try:
+            queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            pass  # Slow client - drop rather than stall the scraper
+
+
+async def relay_to_client(websocket, queue: asyncio.Queue):
+    """Send queued messages to one client, coalescing bursts into a JSON array frame"""
+    try:
+        while True:
+            payloads = [await queue.get()]
+            while not queue.empty() and len(payloads) < MAX_FRAME_MESSAGES:
+                payloads.append(queue.get_nowait())
+            await websocket.send('[' + ','.join(payloads) + ']')
+    except websockets.exceptions.ConnectionClosed:
+        # Stop queueing for this client right away rather than when handle_client notices
+        connected_clients.pop(websocket, None)
 
 
 async def handle_client(websocket):
-    connected_clients.add(websocket)
+    queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+    connected_clients[websocket] = queue
+    relay = asyncio.create_task(relay_to_client(websocket, queue))
     print(f"Client connected. Total: {len(connected_clients)}")
     try:
-        await websocket.send(json.dumps({
+        await websocket.send(json_text({
             'type': 'connected',
             'message': 'Connected to chat visualization backend'
         }))
         async for message in websocket:
-            data = json.loads(message)
-            print(f"Received: {data}")
+            # Clients don't send commands to this backend; only decode when debugging
+            if DEBUG:
+                print(f"Received: {json_parse(message)}")
     except websockets.exceptions.ConnectionClosed:
         pass
     finally:
-        connected_clients.remove(websocket)
+        relay.cancel()
+        connected_clients.pop(websocket, None)
         print(f"Client disconnected. Total: {len(connected_clients)}")
 
 
 # ============== YOUTUBE SCRAPER ==============
 
+CHAT_POLL_INTERVAL = 0.5  # Seconds between pytchat polls
+VIBE_INTERVAL = 3  # Seconds between vibe classification batches
+VIBE_RECENT_MESSAGES = 20  # Messages kept per interval for vibe classification
+
+
+def fetch_chat_items(chat) -> list:
+    """Blocking pytchat fetch (network I/O) - run in a worker thread"""
+    return list(chat.get().sync_items())
+
+
+async def ingest_chat(chat, raw_queue: asyncio.Queue):
+    """Poll YouTube chat and queue processed messages (None marks the end)"""
+    while chat.is_alive():
+        for c in await asyncio.to_thread(fetch_chat_items, chat):
+            await raw_queue.put(process_message(c))
+        await asyncio.sleep(CHAT_POLL_INTERVAL)
+    await raw_queue.put(None)
+
+
+async def filter_messages(raw_queue: asyncio.Queue, vibe_queue: asyncio.Queue, stats: dict):
+    """Drop spam, broadcast ticker/question messages, pass non-spam on for vibes"""
+    frame_msgs = []  # Ticker/question messages from the current poll, sent as one 'messages' event
+    while True:
+        # Poll drained - send what it produced before waiting for the next one
+        if frame_msgs and raw_queue.empty():
+            await broadcast({'type': 'messages', 'data': frame_msgs})
+            frame_msgs = []
+        
+        processed = await raw_queue.get()
+        if processed is None:
+            if frame_msgs:
+                await broadcast({'type': 'messages', 'data': frame_msgs})
+            await vibe_queue.put(None)
+            return
+        stats['messages'] += 1
+        
+        # Filter spam
+        spam_info = processed.get('spam', {})
+        if spam_info.get('is_spam'):
+            stats['spam'] += 1
+            # Log spam for debugging (every 10th)
+            if stats['spam'] % 10 == 1:
+                print(f"[SPAM {stats['spam']}] {spam_info['reason']}: {processed['text'][:50]}...")
+            continue  # Skip spam messages entirely
+        
+        # Borderline case (0.5-0.7 confidence) - use LLM
+        if spam_info.get('confidence', 0) >= 0.5:
+            if await llm_spam_check(processed['text']):
+                stats['spam'] += 1
+                continue
+        
+        # Process non-spam messages
+        if processed['topic'] or processed['isQuestion']:
+            frame_msgs.append(processed)
+        await vibe_queue.put(processed)
+
+
+async def enrich_messages(vibe_queue: asyncio.Queue, stats: dict):
+    """Classify vibes every VIBE_INTERVAL seconds and generate pulse summaries"""
+    loop = asyncio.get_running_loop()
+    vibe_batch = deque(maxlen=VIBE_RECENT_MESSAGES)  # Most recent messages only
+    
+    # Pulse tracking
+    last_pulse_time = loop.time()
+    pulse_message_buffer.clear()  # Messages since last pulse
+    
+    while True:
+        # Collect messages until the next vibe check is due
+        deadline = loop.time() + VIBE_INTERVAL
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                processed = await asyncio.wait_for(vibe_queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if processed is None:
+                return
+            vibe_batch.append(processed)
+            pulse_message_buffer.append(processed)  # Add to pulse buffer
+        
+        # Vibe classification (every VIBE_INTERVAL seconds)
+        if vibe_batch:
+            # Only classify non-spam messages for vibes
+            classified = await classify_vibe_batch(list(vibe_batch))
+            for msg in classified:
+                if msg.get('vibe'):
+                    await broadcast({'type': 'vibe', 'data': msg})
+            vibe_batch.clear()
+            
+            # Periodic stats
+            if stats['messages'] > 0:
+                spam_pct = (stats['spam'] / stats['messages']) * 100
+                print(f"[STATS] {stats['messages']} msgs, {stats['spam']} spam ({spam_pct:.1f}%)")
+        
+        # Pulse summary generation (every PULSE_INTERVAL seconds)
+        current_time = loop.time()
+        if current_time - last_pulse_time >= PULSE_INTERVAL and len(pulse_message_buffer) >= 10:
+            print(f"[PULSE] Generating summary from {len(pulse_message_buffer)} messages...")
+            pulse = await generate_pulse_summary(pulse_message_buffer)
+            if pulse:
+                print(f"[PULSE] {pulse['mood']} {pulse['summary']}")
+                await broadcast({'type': 'pulse', 'data': pulse})
+            pulse_message_buffer.clear()  # Reset buffer
+            last_pulse_time = current_time
+
+
 async def scrape_youtube_chat(video_url: str):
     print(f"Connecting to YouTube chat: {video_url}")
     try:
@@ -1014,93 +1471,50 @@ async def scrape_youtube_chat(video_url: str):
         print("Connected to YouTube chat!")
         print(f"Tracking {len(KNOWN_TICKERS)} tickers")
         
-        vibe_batch = []
-        last_vibe_check = asyncio.get_event_loop().time()
-        
-        spam_count = 0
-        msg_count = 0
-        
-        # Pulse tracking
-        last_pulse_time = asyncio.get_event_loop().time()
-        pulse_buffer = []  # Messages since last pulse
-        
-        while chat.is_alive():
-            for c in chat.get().sync_items():
-                processed = process_message(c)
-                msg_count += 1
-                
-                # Filter spam
-                spam_info = processed.get('spam', {})
-                if spam_info.get('is_spam'):
-                    spam_count += 1
-                    # Log spam for debugging (every 10th)
-                    if spam_count % 10 == 1:
-                        print(f"[SPAM {spam_count}] {spam_info['reason']}: {processed['text'][:50]}...")
-                    continue  # Skip spam messages entirely
-                
-                # Borderline case (0.5-0.7 confidence) - use LLM
-                if spam_info.get('confidence', 0) >= 0.5:
-                    if await llm_spam_check(processed['text']):
-                        spam_count += 1
-                        continue
-                
-                # Process non-spam messages
-                if processed['topic'] or processed['isQuestion']:
-                    await broadcast({'type': 'message', 'data': processed})
-                vibe_batch.append(processed)
-                pulse_buffer.append(processed)  # Add to pulse buffer
-            
-            current_time = asyncio.get_event_loop().time()
-            
-            # Vibe classification (every 3 seconds)
-            if current_time - last_vibe_check >= 3 and vibe_batch:
-                # Only classify non-spam messages for vibes
-                classified = await classify_vibe_batch(vibe_batch[-20:])
-                for msg in classified:
-                    if msg.get('vibe'):
-                        await broadcast({'type': 'vibe', 'data': msg})
-                vibe_batch = []
-                last_vibe_check = current_time
-                
-                # Periodic stats
-                if msg_count > 0:
-                    spam_pct = (spam_count / msg_count) * 100
-                    print(f"[STATS] {msg_count} msgs, {spam_count} spam ({spam_pct:.1f}%)")
-            
-            # Pulse summary generation (every PULSE_INTERVAL seconds)
-            if current_time - last_pulse_time >= PULSE_INTERVAL and len(pulse_buffer) >= 10:
-                print(f"[PULSE] Generating summary from {len(pulse_buffer)} messages...")
-                pulse = await generate_pulse_summary(pulse_buffer)
-                if pulse:
-                    print(f"[PULSE] {pulse['mood']} {pulse['summary']}")
-                    await broadcast({'type': 'pulse', 'data': pulse})
-                pulse_buffer = []  # Reset buffer
-                last_pulse_time = current_time
-            
-            await asyncio.sleep(0.5)
+        # ingest -> filter -> enrich pipeline, so LLM calls never stall chat polling
+        raw_queue = asyncio.Queue()
+        vibe_queue = asyncio.Queue()
+        stats = {'messages': 0, 'spam': 0}
+        tasks = [
+            asyncio.create_task(ingest_chat(chat, raw_queue)),
+            asyncio.create_task(filter_messages(raw_queue, vibe_queue, stats)),
+            asyncio.create_task(enrich_messages(vibe_queue, stats)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
     except Exception as e:
         print(f"YouTube chat error: {e}")
         await broadcast({'type': 'error', 'message': str(e)})
 
 
+VIDEO_ID_PATTERNS = [
+    re.compile(r'(?:v=|/v/|youtu\.be/)([^&?\s]+)'),
+    re.compile(r'(?:embed/)([^&?\s]+)'),
+    re.compile(r'^([a-zA-Z0-9_-]{11})$'),
+]
+
+
 def extract_video_id(url: str) -> str:
-    patterns = [
-        r'(?:v=|/v/|youtu\.be/)([^&?\s]+)',
-        r'(?:embed/)([^&?\s]+)',
-        r'^([a-zA-Z0-9_-]{11})$'
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, url)
+    for pattern in VIDEO_ID_PATTERNS:
+        match = pattern.search(url)
         if match:
             return match.group(1)
     return url
 
 
 async def main(video_url: str):
+    # Bound the threads used for blocking pytchat fetches
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=2))
     print(f"Starting backend on port {WEBSOCKET_PORT}")
     async with serve(handle_client, "0.0.0.0", WEBSOCKET_PORT):
         print(f"WebSocket: ws://0.0.0.0:{WEBSOCKET_PORT}")
-        await scrape_youtube_chat(video_url)
+        try:
+            await scrape_youtube_chat(video_url)
+        finally:
+            await ollama_client.aclose()
 
 
 if __name__ == "__main__":
@@ -1108,4 +1522,9 @@ if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python chat_viz_backend.py <youtube_live_url>")
         sys.exit(1)
-    asyncio.run(main(sys.argv[1]))
+    try:
+        import uvloop
+    except ImportError:
+        uvloop = None  # Optional - faster event loop (not available on Windows)
+    run = uvloop.run if uvloop else asyncio.run
+    run(main(sys.argv[1]))
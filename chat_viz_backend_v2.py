@@ -7,10 +7,17 @@ import asyncio
 import json
 import re
 import os
+import string
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional, Dict, Set
 import websockets
 from websockets.server import serve
+from websockets.legacy.protocol import broadcast as ws_broadcast
+from websockets.protocol import State
 import pytchat
 import httpx
 import emoji
@@ -40,6 +47,20 @@ GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
 print(f"[Config] LLM Provider: {LLM_PROVIDER}")
 print(f"[Config] WebSocket Port: {WEBSOCKET_PORT}")
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Optional - stdlib json is used instead
+
+
+def json_text(obj) -> str:
+    """Serialize to a JSON string (WebSocket text frames - the extension JSON.parses event.data)"""
+    return orjson.dumps(obj).decode() if orjson else json.dumps(obj)
+
+
+def json_parse(data):
+    return orjson.loads(data) if orjson else json.loads(data)
+
 
 # ============== RATE LIMIT STATE ==============
 
@@ -104,6 +125,14 @@ rate_limit_state = RateLimitState(cooldown_seconds=60)
 
 # ============== UNIFIED LLM INTERFACE ==============
 
+# Shared HTTP client so LLM calls reuse keep-alive connections (no TLS handshake per prompt)
+# Per-call timeouts are passed to post(); closed in main()
+llm_client = httpx.AsyncClient(
+    timeout=10.0,
+    limits=httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60),
+)
+
+
 async def llm_complete(prompt: str, temperature: float = 0, timeout: float = 10.0) -> Optional[str]:
     """
     Unified LLM completion function.
@@ -117,54 +146,55 @@ async def llm_complete(prompt: str, temperature: float = 0, timeout: float = 10.
         return None
     
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            if LLM_PROVIDER == "groq" and GROQ_API_KEY:
-                # Groq (OpenAI-compatible API)
-                response = await client.post(
-                    GROQ_URL,
-                    headers={
-                        "Authorization": f"Bearer {GROQ_API_KEY}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": GROQ_MODEL,
-                        "messages": [{"role": "user", "content": prompt}],
-                        "temperature": temperature,
-                        "max_tokens": 150
-                    }
-                )
-                
-                # Check for rate limit (HTTP 429)
-                if response.status_code == 429:
+        if LLM_PROVIDER == "groq" and GROQ_API_KEY:
+            # Groq (OpenAI-compatible API)
+            response = await llm_client.post(
+                GROQ_URL,
+                headers={
+                    "Authorization": f"Bearer {GROQ_API_KEY}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": GROQ_MODEL,
+                    "messages": [{"role": "user", "content": prompt}],
+                    "temperature": temperature,
+                    "max_tokens": 150
+                },
+                timeout=timeout
+            )
+            
+            # Check for rate limit (HTTP 429)
+            if response.status_code == 429:
+                rate_limit_state.mark_limited()
+                return None
+            
+            data = response.json()
+            
+            # Check for rate limit in error response
+            if "error" in data:
+                error_msg = data['error'].get('message', str(data['error'])).lower()
+                if 'rate' in error_msg or 'limit' in error_msg or 'quota' in error_msg:
                     rate_limit_state.mark_limited()
                     return None
-                
-                data = response.json()
-                
-                # Check for rate limit in error response
-                if "error" in data:
-                    error_msg = data['error'].get('message', str(data['error'])).lower()
-                    if 'rate' in error_msg or 'limit' in error_msg or 'quota' in error_msg:
-                        rate_limit_state.mark_limited()
-                        return None
-                    print(f"[LLM] Groq error: {data['error'].get('message', data['error'])}")
-                    return None
-                
-                # Success - reset consecutive failures
-                rate_limit_state.mark_success()
-                return data["choices"][0]["message"]["content"].strip()
-            else:
-                # Ollama (local) - no rate limiting concerns
-                response = await client.post(
-                    OLLAMA_URL,
-                    json={
-                        "model": OLLAMA_MODEL,
-                        "prompt": prompt,
-                        "stream": False,
-                        "options": {"temperature": temperature}
-                    }
-                )
-                return response.json()["response"].strip()
+                print(f"[LLM] Groq error: {data['error'].get('message', data['error'])}")
+                return None
+            
+            # Success - reset consecutive failures
+            rate_limit_state.mark_success()
+            return data["choices"][0]["message"]["content"].strip()
+        else:
+            # Ollama (local) - no rate limiting concerns
+            response = await llm_client.post(
+                OLLAMA_URL,
+                json={
+                    "model": OLLAMA_MODEL,
+                    "prompt": prompt,
+                    "stream": False,
+                    "options": {"temperature": temperature}
+                },
+                timeout=timeout
+            )
+            return response.json()["response"].strip()
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 429:
             rate_limit_state.mark_limited()
@@ -205,18 +235,52 @@ PULSE_MESSAGE_WINDOW = 100
 VIBE_CHECK_INTERVAL = 30  # Check vibes every 30 seconds (was 3)
 VIBE_BATCH_SIZE = 3  # Only classify 3 messages at a time (was 10)
 
+
+@dataclass(slots=True)
+class VideoState:
+    """Per-video scraper state"""
+    pulse_buffer: list = field(default_factory=list)
+    user_message_history: dict = field(default_factory=dict)  # {author: new_user_history()}
+    session_discovered: set = field(default_factory=set)
+    # Running aggregates over pulse_buffer, so pulse summaries don't rescan it
+    ticker_counts: Counter = field(default_factory=Counter)
+    bullish_count: int = 0
+    bearish_count: int = 0
+    
+    def add_pulse_message(self, msg):
+        self.pulse_buffer.append(msg)
+        self._count_pulse_message(msg, 1)
+    
+    def trim_pulse_buffer(self, keep: int):
+        """Keep only the newest `keep` messages in pulse_buffer"""
+        for msg in self.pulse_buffer[:-keep]:
+            self._count_pulse_message(msg, -1)
+        self.pulse_buffer = self.pulse_buffer[-keep:]
+    
+    def reset_pulse(self):
+        self.pulse_buffer = []
+        self.ticker_counts = Counter()
+        self.bullish_count = self.bearish_count = 0
+    
+    def _count_pulse_message(self, msg, delta: int):
+        if msg.topic:
+            self.ticker_counts[msg.topic] += delta
+            if self.ticker_counts[msg.topic] <= 0:
+                del self.ticker_counts[msg.topic]
+        if msg.sentiment == 'bullish':
+            self.bullish_count += delta
+        elif msg.sentiment == 'bearish':
+            self.bearish_count += delta
+
+
 # Per-video state
-video_state: Dict[str, dict] = {}
+video_state: Dict[str, VideoState] = {}
 
 
-def get_video_state(video_id: str) -> dict:
+def get_video_state(video_id: str) -> VideoState:
     """Get or create state for a video"""
     if video_id not in video_state:
-        video_state[video_id] = {
-            'pulse_buffer': [],
-            'user_message_history': {},
-            'session_discovered': set(),
-        }
+        video_state[video_id] = VideoState()
     return video_state[video_id]
 
 
@@ -303,44 +367,81 @@ STOCK_CONTEXT_WORDS = {
 }
 
 
+# Precompiled once - one scan for every company name instead of a search per name
+COMPANY_RE = re.compile(r'\b(' + '|'.join(map(re.escape, COMPANY_NAMES)) + r')\b')
+COMPANY_PRIORITY = {name: priority for priority, name in enumerate(COMPANY_NAMES)}
+DOLLAR_RE = re.compile(r'\$([A-Z]{1,5})\b')
+TICKER_WORD_RE = re.compile(r'\b([A-Z]{2,5})\b')
+WORD_RE = re.compile(r'\w+')
+
+# Derived once so extract_ticker needs no set algebra per message
+TICKER_BLOCKLIST = frozenset(IGNORE_WORDS | DOLLAR_ONLY_TICKERS)
+KNOWN_UNAMBIGUOUS = frozenset(KNOWN_TICKERS - AMBIGUOUS_TICKERS)
+KNOWN_AMBIGUOUS = frozenset(KNOWN_TICKERS & AMBIGUOUS_TICKERS)
+
+
+# Chat repeats itself ("lol", emote spam, copy-pasted tickers), so the pure
+# text-only steps below are memoized on the message text
+TEXT_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def tokenize(text: str) -> frozenset:
+    """Lowercased word set shared by the context and sentiment checks"""
+    return frozenset(WORD_RE.findall(text.lower()))
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
 def has_stock_context(text: str) -> bool:
-    text_lower = text.lower()
-    words = set(re.findall(r'\w+', text_lower))
-    return bool(words & STOCK_CONTEXT_WORDS)
+    return bool(tokenize(text) & STOCK_CONTEXT_WORDS)
 
 
-def extract_ticker(text: str, session_discovered: set) -> Optional[str]:
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def ticker_candidates(text: str) -> tuple:
+    """
+    Session-independent part of extract_ticker.
+    Returns: ($TICKER or None, company-name ticker or None, tuple of 2-5 letter words)
+    """
     text_upper = text.upper()
     
+    dollar_match = DOLLAR_RE.search(text_upper)
+    dollar_ticker = dollar_match.group(1) if dollar_match else None
+    if dollar_ticker in IGNORE_WORDS:
+        dollar_ticker = None
+    
+    # Earlier COMPANY_NAMES entries win, as before
+    names = COMPANY_RE.findall(text_upper)
+    company_ticker = COMPANY_NAMES[min(names, key=COMPANY_PRIORITY.__getitem__)] if names else None
+    
+    return dollar_ticker, company_ticker, tuple(TICKER_WORD_RE.findall(text_upper))
+
+
+def extract_ticker(text: str, session_discovered: set) -> Optional[str]:
+    dollar_ticker, company_ticker, words = ticker_candidates(text)
+    
     # 1. $TICKER format
-    dollar_match = re.search(r'\$([A-Z]{1,5})\b', text_upper)
-    if dollar_match:
-        ticker = dollar_match.group(1)
-        if ticker not in IGNORE_WORDS:
-            session_discovered.add(ticker)
-            return ticker
+    if dollar_ticker:
+        session_discovered.add(dollar_ticker)
+        return dollar_ticker
     
     # 2. Company names
-    for name, ticker in COMPANY_NAMES.items():
-        if re.search(r'\b' + name + r'\b', text_upper):
-            return ticker
-    
-    # 3. Known tickers
-    all_valid = KNOWN_TICKERS | session_discovered
-    words = re.findall(r'\b([A-Z]{2,5})\b', text_upper)
+    if company_ticker:
+        return company_ticker
     
+    # 3. Known tickers (session discoveries are checked directly instead of
+    # building KNOWN_TICKERS | session_discovered for every message)
     for word in words:
-        if word in IGNORE_WORDS or word in DOLLAR_ONLY_TICKERS:
+        if word in TICKER_BLOCKLIST:
             continue
-        if word in all_valid and word not in AMBIGUOUS_TICKERS:
+        if word in KNOWN_UNAMBIGUOUS or (word in session_discovered and word not in AMBIGUOUS_TICKERS):
             return word
     
     # Check ambiguous with context
     if has_stock_context(text):
         for word in words:
-            if word in IGNORE_WORDS or word in DOLLAR_ONLY_TICKERS:
+            if word in TICKER_BLOCKLIST:
                 continue
-            if word in all_valid and word in AMBIGUOUS_TICKERS:
+            if word in KNOWN_AMBIGUOUS or (word in session_discovered and word in AMBIGUOUS_TICKERS):
                 return word
     
     return None
@@ -382,15 +483,22 @@ QUESTION_PATTERNS = [
 QUESTION_PATTERN = re.compile('|'.join(QUESTION_PATTERNS), re.IGNORECASE)
 
 
+BULLISH_EMOJIS = frozenset('🚀📈💚🟢🔥')
+BEARISH_EMOJIS = frozenset('📉💔🔴🩸💀')
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
 def analyze_sentiment(text: str) -> str:
-    text_lower = text.lower()
-    words = set(re.findall(r'\w+', text_lower))
+    words = tokenize(text)
     bullish_count = len(words & BULLISH_WORDS)
     bearish_count = len(words & BEARISH_WORDS)
-    if '🚀' in text or '📈' in text or '💚' in text or '🟢' in text or '🔥' in text:
-        bullish_count += 2
-    if '📉' in text or '💔' in text or '🔴' in text or '🩸' in text or '💀' in text:
-        bearish_count += 2
+    # One pass over the text builds its character set; emoji score once per side, as before
+    if not text.isascii():
+        chars = set(text)
+        if not chars.isdisjoint(BULLISH_EMOJIS):
+            bullish_count += 2
+        if not chars.isdisjoint(BEARISH_EMOJIS):
+            bearish_count += 2
     if bullish_count > bearish_count:
         return 'bullish'
     elif bearish_count > bullish_count:
@@ -398,30 +506,127 @@ def analyze_sentiment(text: str) -> str:
     return 'neutral'
 
 
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
 def is_question(text: str) -> bool:
     return bool(QUESTION_PATTERN.search(text))
 
 
+def analyze_message(text: str, session_discovered: set) -> tuple:
+    """Ticker, sentiment and question flag; tokenize() is cached, so the text is tokenized once"""
+    ticker = extract_ticker(text, session_discovered)
+    sentiment = analyze_sentiment(text) if ticker else 'neutral'
+    return ticker, sentiment, is_question(text)
+
+
 # ============== SPAM DETECTION ==============
 
-SPAM_LINK_RE = re.compile(r'discord\.gg/|t\.me/|bit\.ly/|tinyurl\.com/|telegram\.|join.*group|join.*channel|dm.*me', re.IGNORECASE)
-SPAM_PUMP_RE = re.compile(r'guaranteed.*gains|100x|1000x|free.*money|free.*crypto|airdrop|giveaway.*crypto|double.*your|insider.*info|financial.*freedom|limited.*spots|get.*rich|pump.*coming|moon.*guaranteed|subscribe.*my|follow.*my', re.IGNORECASE)
-SPAM_CRYPTO_RE = re.compile(r'send.*\d+.*eth|send.*\d+.*btc|wallet.*address|connect.*wallet|validate.*wallet|claim.*reward', re.IGNORECASE)
+SPAM_LINK_PATTERNS = [
+    r'discord\.gg/', r't\.me/', r'bit\.ly/', r'tinyurl\.com/', r'telegram\.',
+    r'join.*group', r'join.*channel', r'dm.*me',
+]
+SPAM_PUMP_PATTERNS = [
+    r'guaranteed.*gains', r'100x', r'1000x', r'free.*money', r'free.*crypto',
+    r'airdrop', r'giveaway.*crypto', r'double.*your', r'insider.*info',
+    r'financial.*freedom', r'limited.*spots', r'get.*rich', r'pump.*coming',
+    r'moon.*guaranteed', r'subscribe.*my', r'follow.*my',
+]
+SPAM_CRYPTO_PATTERNS = [
+    r'send.*\d+.*eth', r'send.*\d+.*btc', r'wallet.*address',
+    r'connect.*wallet', r'validate.*wallet', r'claim.*reward',
+]
+SPAM_LINK_RE = re.compile('|'.join(SPAM_LINK_PATTERNS), re.IGNORECASE)
+SPAM_PUMP_RE = re.compile('|'.join(SPAM_PUMP_PATTERNS), re.IGNORECASE)
+SPAM_CRYPTO_RE = re.compile('|'.join(SPAM_CRYPTO_PATTERNS), re.IGNORECASE)
+REPEATED_CHAR_RE = re.compile(r'(.)\1{4,}')  # Backreference - always plain `re`
+
+# Spam categories in the order detect_spam reports them. With google-re2 installed
+# every pattern is compiled into one RE2::Set and the lowercased message is matched
+# in a single linear pass; otherwise each category's `re` pattern is searched.
+SPAM_CATEGORIES = {
+    'promo_link': (SPAM_LINK_PATTERNS, SPAM_LINK_RE),
+    'pump_promo': (SPAM_PUMP_PATTERNS, SPAM_PUMP_RE),
+    'crypto_scam': (SPAM_CRYPTO_PATTERNS, SPAM_CRYPTO_RE),
+}
+
+try:
+    import re2
+except ImportError:
+    re2 = None  # Optional - per-category regex scan is used instead
+
+
+def _build_spam_set():
+    """
+    Compile every spam pattern into one RE2 set.
+    Returns: (pattern_set, category name for each pattern index)
+    """
+    pattern_set = re2.Set.SearchSet(re2.Options())
+    pattern_categories = []
+    for name, (patterns, _) in SPAM_CATEGORIES.items():
+        for pattern in patterns:
+            pattern_set.Add(pattern)
+            pattern_categories.append(name)
+    pattern_set.Compile()
+    return pattern_set, pattern_categories
+
+
+SPAM_SET, SPAM_SET_CATEGORIES = _build_spam_set() if re2 else (None, None)
+
+
+def match_spam_categories(text: str, text_lower: str) -> set:
+    """Return the names of all SPAM_CATEGORIES that match the message"""
+    if SPAM_SET is None:
+        return {name for name, (_, regex) in SPAM_CATEGORIES.items() if regex.search(text)}
+    return {SPAM_SET_CATEGORIES[i] for i in SPAM_SET.Match(text_lower) or ()}
 
 HISTORY_WINDOW = 60
 MAX_HISTORY_PER_USER = 20
 
 
+_ASCII_LETTERS = string.ascii_letters.encode()
+_ASCII_UPPERCASE = string.ascii_uppercase.encode()
+
+
+def char_stats(text: str) -> tuple:
+    """Return (letters, uppercase letters, emojis) in one pass over text"""
+    if text.isascii():
+        # Most chat is ASCII (and has no emoji): let bytes.translate do the counting in C
+        raw = text.encode('ascii')
+        alpha = len(raw) - len(raw.translate(None, _ASCII_LETTERS))
+        upper = len(raw) - len(raw.translate(None, _ASCII_UPPERCASE))
+        return alpha, upper, 0
+    emoji_data = emoji.EMOJI_DATA
+    alpha = upper = emoji_count = 0
+    for c in text:
+        if c.isalpha():
+            alpha += 1
+            if c.isupper():
+                upper += 1
+        if c in emoji_data:
+            emoji_count += 1
+    return alpha, upper, emoji_count
+
+
+def new_user_history() -> tuple:
+    """(deque of (ts, text_hash), Counter of text_hash) - the Counter mirrors the deque for O(1) duplicate checks"""
+    return deque(maxlen=MAX_HISTORY_PER_USER), Counter()
+
+
+def forget_hash(hash_counts: Counter, text_hash: int):
+    hash_counts[text_hash] -= 1
+    if hash_counts[text_hash] <= 0:
+        del hash_counts[text_hash]
+
+
 def clean_history(author: str, current_time: float, user_history: dict):
     if author in user_history:
-        user_history[author] = [
-            (ts, h) for ts, h in user_history[author]
-            if current_time - ts < HISTORY_WINDOW
-        ][-MAX_HISTORY_PER_USER:]
+        history, hash_counts = user_history[author]
+        # Entries are appended in time order, so expired ones are always at the left
+        while history and current_time - history[0][0] >= HISTORY_WINDOW:
+            forget_hash(hash_counts, history.popleft()[1])
 
 
-def detect_spam(text: str, author: str, user_history: dict) -> dict:
-    current_time = datetime.now().timestamp()
+def detect_spam(text: str, author: str, user_history: dict, current_time: float) -> dict:
+    """current_time is a monotonic timestamp (loop.time() / time.monotonic())"""
     clean_history(author, current_time, user_history)
     
     text_lower = text.lower()
@@ -429,50 +634,53 @@ def detect_spam(text: str, author: str, user_history: dict) -> dict:
     reasons = []
     confidence = 0.0
     
-    if author in user_history:
-        recent_hashes = [h for _, h in user_history[author]]
-        if text_hash in recent_hashes:
-            reasons.append('duplicate')
-            confidence = max(confidence, 0.9)
+    if author not in user_history:
+        user_history[author] = new_user_history()
+    history, hash_counts = user_history[author]
     
-    if author in user_history:
-        recent_timestamps = [ts for ts, _ in user_history[author]]
-        recent_10s = [ts for ts in recent_timestamps if current_time - ts < 10]
-        if len(recent_10s) >= 5:  # Was 3 - more lenient for active chatters
+    if text_hash in hash_counts:
+        reasons.append('duplicate')
+        confidence = max(confidence, 0.9)
+    
+    if history:
+        recent_10s = sum(1 for ts, _ in history if current_time - ts < 10)
+        if recent_10s >= 5:  # Was 3 - more lenient for active chatters
             reasons.append('rapid_fire')
             confidence = max(confidence, 0.6)  # Was 0.8 - triggers LLM check, not auto-drop
     
-    if SPAM_LINK_RE.search(text):
+    spam_categories = match_spam_categories(text, text_lower)
+    
+    if 'promo_link' in spam_categories:
         reasons.append('promo_link')
         confidence = max(confidence, 0.85)
     
-    if SPAM_PUMP_RE.search(text):
+    if 'pump_promo' in spam_categories:
         reasons.append('pump_promo')
         confidence = max(confidence, 0.8)
     
-    if SPAM_CRYPTO_RE.search(text):
+    if 'crypto_scam' in spam_categories:
         reasons.append('crypto_scam')
         confidence = max(confidence, 0.95)
     
-    alpha_chars = [c for c in text if c.isalpha()]
-    if len(alpha_chars) >= 10:
-        caps_ratio = sum(1 for c in alpha_chars if c.isupper()) / len(alpha_chars)
+    alpha_count, upper_count, emoji_count = char_stats(text)
+    if alpha_count >= 10:
+        caps_ratio = upper_count / alpha_count
         if caps_ratio > 0.7:
             reasons.append('excessive_caps')
             confidence = max(confidence, 0.5)
     
-    if re.search(r'(.)\1{4,}', text):
+    if REPEATED_CHAR_RE.search(text):
         reasons.append('repetitive_chars')
         confidence = max(confidence, 0.4)
     
-    emoji_count = len([c for c in text if c in emoji.EMOJI_DATA])
     if emoji_count > 10:
         reasons.append('excessive_emojis')
         confidence = max(confidence, 0.5)
     
-    if author not in user_history:
-        user_history[author] = []
-    user_history[author].append((current_time, text_hash))
+    if len(history) == history.maxlen:
+        forget_hash(hash_counts, history[0][1])
+    history.append((current_time, text_hash))
+    hash_counts[text_hash] += 1
     
     if len(reasons) >= 2 and confidence < 0.7:
         confidence = min(0.75, confidence + 0.2)
@@ -485,36 +693,86 @@ def detect_spam(text: str, author: str, user_history: dict) -> dict:
     }
 
 
-async def llm_spam_check(text: str) -> bool:
-    prompt = f"""Is this YouTube chat message spam, promotion, or bot-generated?
-Message: "{text}"
+# Borderline messages are coalesced into one numbered prompt per window
+SPAM_CHECK_BATCH_SIZE = 8  # Max messages per LLM request
+SPAM_CHECK_WINDOW = 0.2  # Seconds to wait for more messages before sending
+SPAM_LINE_RE = re.compile(r'^\s*(\d+)\s*[.):-]\s*\W*(yes|no)\b', re.IGNORECASE | re.MULTILINE)
+spam_check_queue = None  # asyncio.Queue of (text, future), created with the worker
+spam_check_worker_task = None
+
+
+async def llm_spam_check_many(texts: list) -> list:
+    """Ask the LLM about several messages in one request (True where it says spam)"""
+    if len(texts) == 1:
+        prompt = f"""Is this YouTube chat message spam, promotion, or bot-generated?
+Message: "{texts[0]}"
 Reply with ONLY: yes or no"""
+        result = await llm_complete(prompt, temperature=0, timeout=3.0)
+        return [bool(result) and "yes" in result.lower()]
     
-    result = await llm_complete(prompt, temperature=0, timeout=3.0)
-    if result:
-        return "yes" in result.lower()
-    return False
+    numbered = "\n".join(f'{i}. "{" ".join(t.split())}"' for i, t in enumerate(texts, 1))
+    prompt = f"""Is each YouTube chat message below spam, promotion, or bot-generated?
+
+Messages:
+{numbered}
+
+Reply with one line per message, formatted as "<number>. yes" or "<number>. no", and nothing else"""
+    
+    result = await llm_complete(prompt, temperature=0, timeout=5.0)
+    verdicts = [False] * len(texts)
+    for num, answer in SPAM_LINE_RE.findall(result or ''):
+        idx = int(num) - 1
+        if 0 <= idx < len(texts):
+            verdicts[idx] = answer.lower() == 'yes'
+    return verdicts
+
+
+async def spam_check_worker():
+    """Drain spam_check_queue in batches of up to SPAM_CHECK_BATCH_SIZE every SPAM_CHECK_WINDOW"""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await spam_check_queue.get()]
+        deadline = loop.time() + SPAM_CHECK_WINDOW
+        while len(batch) < SPAM_CHECK_BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(spam_check_queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        
+        verdicts = await llm_spam_check_many([text for text, _ in batch])
+        for (_, fut), is_spam in zip(batch, verdicts):
+            if not fut.done():
+                fut.set_result(is_spam)
+
+
+async def llm_spam_check(text: str) -> bool:
+    """LLM second opinion for a borderline message (batched with concurrent calls)"""
+    global spam_check_queue, spam_check_worker_task
+    if spam_check_worker_task is None or spam_check_worker_task.done():
+        spam_check_queue = asyncio.Queue()
+        spam_check_worker_task = asyncio.create_task(spam_check_worker())
+    
+    fut = asyncio.get_running_loop().create_future()
+    spam_check_queue.put_nowait((text, fut))
+    return await fut
 
 
 # ============== CHAT PULSE ==============
 
-async def generate_pulse_summary(messages: list) -> dict:
+async def generate_pulse_summary(state: VideoState) -> dict:
+    messages = state.pulse_buffer
     if not messages:
         return None
     
-    texts = [m['text'] for m in messages[-PULSE_MESSAGE_WINDOW:]]
-    tickers = [m['topic'] for m in messages if m.get('topic')]
-    sentiments = [m['sentiment'] for m in messages if m.get('sentiment') != 'neutral']
-    
-    ticker_counts = {}
-    for t in tickers:
-        ticker_counts[t] = ticker_counts.get(t, 0) + 1
-    top_tickers = sorted(ticker_counts.items(), key=lambda x: -x[1])[:3]
-    
-    bullish_count = sentiments.count('bullish')
-    bearish_count = sentiments.count('bearish')
+    # Ticker and sentiment counts are kept up to date as messages are buffered
+    top_tickers = state.ticker_counts.most_common(3)
+    bullish_count = state.bullish_count
+    bearish_count = state.bearish_count
     
-    sample_msgs = "\n".join(texts[-30:])
+    sample_msgs = "\n".join(m.text for m in messages[-30:])
     ticker_summary = ", ".join([f"{t}({c})" for t, c in top_tickers]) if top_tickers else "none"
     sentiment_summary = f"{bullish_count} bullish, {bearish_count} bearish"
     
@@ -575,37 +833,114 @@ Reply with ONLY one word: funny, uplifting, or none"""
     return None
 
 
+# Vibes for a batch are asked for in one numbered prompt; lines the model skips
+# fall back to single-message prompts, at most VIBE_FALLBACK_CONCURRENCY at a time
+VIBE_LINE_RE = re.compile(r'^\s*(\d+)\s*[.):-]\s*\W*(funny|uplifting|none)\b', re.IGNORECASE | re.MULTILINE)
+VIBE_FALLBACK_CONCURRENCY = 3
+vibe_fallback_semaphore = asyncio.Semaphore(VIBE_FALLBACK_CONCURRENCY)
+
+
+async def classify_vibe_many(texts: list) -> list:
+    """Classify several messages with one LLM request (None where not funny/uplifting)"""
+    if len(texts) == 1:
+        return [await classify_vibe_single(texts[0])]
+    
+    numbered = "\n".join(f'{i}. "{" ".join(t.split())}"' for i, t in enumerate(texts, 1))
+    prompt = f"""Classify each YouTube chat message below into EXACTLY ONE category:
+- funny: jokes, humor, laughter (lmao, haha, 😂, etc.)
+- uplifting: encouragement, positivity, support
+- none: neutral, questions, or anything else
+
+Messages:
+{numbered}
+
+Reply with one line per message, formatted as "<number>. <category>", and nothing else"""
+    
+    result = await llm_complete(prompt, temperature=0, timeout=5.0)
+    if result is None:
+        return [None] * len(texts)  # Rate limited or unreachable - retrying per message won't help
+    
+    vibes = {}
+    for num, word in VIBE_LINE_RE.findall(result):
+        idx = int(num) - 1
+        if 0 <= idx < len(texts):
+            word = word.lower()
+            vibes[idx] = word if word != "none" else None
+    
+    async def classify_skipped(idx: int):
+        async with vibe_fallback_semaphore:
+            vibes[idx] = await classify_vibe_single(texts[idx])
+    
+    skipped = [idx for idx in range(len(texts)) if idx not in vibes]
+    if skipped:
+        await asyncio.gather(*[classify_skipped(idx) for idx in skipped])
+    return [vibes[idx] for idx in range(len(texts))]
+
+
 async def classify_vibe_batch(messages: list) -> list:
     if not messages:
         return messages
     
     # Only classify a few messages to stay within rate limits
-    tasks = [classify_vibe_single(msg['text']) for msg in messages[:VIBE_BATCH_SIZE]]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    batch = messages[:VIBE_BATCH_SIZE]
+    results = await classify_vibe_many([msg.text for msg in batch])
     
-    for i, (msg, vibe) in enumerate(zip(messages[:VIBE_BATCH_SIZE], results)):
-        if isinstance(vibe, str) and vibe in ('funny', 'uplifting'):
-            msg['vibe'] = vibe
+    for msg, vibe in zip(batch, results):
+        if vibe in ('funny', 'uplifting'):
+            msg.vibe = vibe
     
     return messages
 
 
+YT_EMOJI_MAP = {
+    ':rolling_on_floor_laughing:': '🤣', ':face_with_tears_of_joy:': '😂',
+    ':fire:': '🔥', ':rocket:': '🚀', ':thumbs_up:': '👍', ':thumbs_down:': '👎',
+    ':red_heart:': '❤️', ':skull:': '💀', ':money_bag:': '💰',
+    ':chart_increasing:': '📈', ':chart_decreasing:': '📉',
+}
+YT_EMOJI_RE = re.compile('|'.join(map(re.escape, YT_EMOJI_MAP)))
+
+
 def convert_emoji_codes(text: str) -> str:
-    yt_emoji_map = {
-        ':rolling_on_floor_laughing:': '🤣', ':face_with_tears_of_joy:': '😂',
-        ':fire:': '🔥', ':rocket:': '🚀', ':thumbs_up:': '👍', ':thumbs_down:': '👎',
-        ':red_heart:': '❤️', ':skull:': '💀', ':money_bag:': '💰',
-        ':chart_increasing:': '📈', ':chart_decreasing:': '📉',
-    }
-    for code, emj in yt_emoji_map.items():
-        text = text.replace(code, emj)
-    text = emoji.emojize(text, language='alias')
-    return text
+    # Every code is :name: - without two colons there is nothing to convert
+    if text.count(':') < 2:
+        return text
+    text = YT_EMOJI_RE.sub(lambda m: YT_EMOJI_MAP[m.group(0)], text)
+    if text.count(':') < 2:
+        return text
+    return emoji.emojize(text, language='alias')
 
 
 # ============== MESSAGE PROCESSING ==============
 
-def process_message(chat_msg, video_state: dict) -> dict:
+@dataclass(slots=True)
+class Processed:
+    """A processed chat message; to_dict() is the wire format sent to clients"""
+    text: str
+    author: str
+    timestamp: str
+    topic: Optional[str]
+    sentiment: str
+    is_question: bool
+    spam: dict
+    vibe: Optional[str] = None
+    
+    def to_dict(self) -> dict:
+        return {
+            'text': self.text,
+            'author': self.author,
+            'timestamp': self.timestamp,
+            'topic': self.topic,
+            'sentiment': self.sentiment,
+            'isQuestion': self.is_question,
+            'vibe': self.vibe,
+            'spam': self.spam
+        }
+
+
+def process_message(chat_msg, video_state: VideoState, now: float = None) -> Processed:
+    if now is None:
+        now = time.monotonic()
     text = convert_emoji_codes(chat_msg.message)
     author = chat_msg.author.name
     
@@ -615,50 +950,63 @@ def process_message(chat_msg, video_state: dict) -> dict:
     if is_privileged:
         spam_result = {'is_spam': False, 'reason': None, 'reasons': [], 'confidence': 0.0}
     else:
-        spam_result = detect_spam(text, author, video_state['user_message_history'])
-    
-    result = {
-        'text': text,
-        'author': author,
-        'timestamp': datetime.now().isoformat(),
-        'topic': extract_ticker(text, video_state['session_discovered']),
-        'sentiment': 'neutral',
-        'isQuestion': is_question(text),
-        'vibe': None,
-        'spam': spam_result
-    }
-    if result['topic']:
-        result['sentiment'] = analyze_sentiment(text)
-    return result
+        spam_result = detect_spam(text, author, video_state.user_message_history, now)
+    
+    topic, sentiment, question = analyze_message(text, video_state.session_discovered)
+    return Processed(
+        text=text,
+        author=author,
+        timestamp=datetime.now().isoformat(),
+        topic=topic,
+        sentiment=sentiment,
+        is_question=question,
+        spam=spam_result
+    )
 
 
 # ============== BROADCAST ==============
 
+def encode_frame(messages: list) -> str:
+    """Encode messages as one text frame - a single message as-is, several as a 'batch'"""
+    if len(messages) == 1:
+        return json_text(messages[0])
+    return json_text({'type': 'batch', 'items': messages})
+
+
+def prune_closed_clients(clients):
+    """Forget connections a broadcast skipped because they are no longer open"""
+    closed = {ws for ws in clients if ws.state is not State.OPEN}
+    if not closed:
+        return
+    # Drop them now rather than when handle_client notices, so the scraper's
+    # no-clients check sees the true count and no frames are built for them
+    connected_clients.difference_update(closed)
+    for subscribers in video_clients.values():
+        subscribers.difference_update(closed)
+
+
 async def broadcast_to_video(video_id: str, message: dict):
     """Broadcast message to all clients watching a specific video"""
-    if video_id not in video_clients:
-        return
-    
-    clients = video_clients[video_id].copy()
-    if not clients:
+    await broadcast_many_to_video(video_id, [message])
+
+
+async def broadcast_many_to_video(video_id: str, messages: list):
+    """Broadcast several messages to a video's clients in a single frame"""
+    clients = video_clients.get(video_id)
+    if not clients or not messages:
         return
-    
-    msg_json = json.dumps(message)
-    await asyncio.gather(
-        *[c.send(msg_json) for c in clients],
-        return_exceptions=True
-    )
+    # Encoded and framed once, then written to every open connection without
+    # awaiting each send; closed connections are skipped
+    ws_broadcast(clients, encode_frame(messages))
+    prune_closed_clients(clients)
 
 
 async def broadcast_global(message: dict):
     """Broadcast to all connected clients (backwards compatibility)"""
     if not connected_clients:
         return
-    msg_json = json.dumps(message)
-    await asyncio.gather(
-        *[c.send(msg_json) for c in connected_clients],
-        return_exceptions=True
-    )
+    ws_broadcast(connected_clients, json_text(message))
+    prune_closed_clients(connected_clients)
 
 
 async def broadcast_rate_limit_status(video_id: str = None):
@@ -677,20 +1025,48 @@ async def broadcast_rate_limit_status(video_id: str = None):
 
 # ============== YOUTUBE SCRAPER ==============
 
+# One anchored match whose branches are tried in priority order: watch/short URLs,
+# then embed/, then live/, then a bare 11-character ID. Each `.*?` scans forward
+# like re.search, so results match searching the patterns one by one.
+VIDEO_ID_RE = re.compile(
+    r'.*?(?:v=|/v/|youtu\.be/)([^&?\s]+)'
+    r'|.*?(?:embed/)([^&?\s]+)'
+    r'|.*?(?:live/)([^&?\s]+)'
+    r'|([a-zA-Z0-9_-]{11})$',
+    re.DOTALL
+)
+
+
+@lru_cache(maxsize=512)
 def extract_video_id(url: str) -> str:
-    patterns = [
-        r'(?:v=|/v/|youtu\.be/)([^&?\s]+)',
-        r'(?:embed/)([^&?\s]+)',
-        r'(?:live/)([^&?\s]+)',
-        r'^([a-zA-Z0-9_-]{11})$'
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
+    match = VIDEO_ID_RE.match(url)
+    if match:
+        return match.group(match.lastindex)
     return url
 
 
+# Poll quickly while chat is flowing, back off exponentially on quiet/dead streams
+CHAT_POLL_MIN = 0.1  # Seconds between polls after a poll that returned messages
+CHAT_POLL_MAX = 2.0  # Longest back-off after repeated empty polls
+
+
+def fetch_chat_items(chat) -> list:
+    """Blocking pytchat fetch (network I/O) - run in a worker thread"""
+    return list(chat.get().sync_items())
+
+
+def poll_chat(chat, state: VideoState) -> list:
+    """
+    Fetch one poll of chat and process it - run in a worker thread so neither the
+    network wait nor the per-message regex/spam work stalls the event loop.
+    Only this video's scraper touches its VideoState and it awaits this call, so
+    the state needs no locking; the shared lru_caches are thread-safe.
+    """
+    items = fetch_chat_items(chat)
+    poll_time = time.monotonic()
+    return [process_message(c, state, poll_time) for c in items]
+
+
 async def scrape_youtube_chat(video_id: str):
     """Scrape chat for a specific video and broadcast to subscribers"""
     print(f"[Scraper] Starting scrape for video: {video_id}")
@@ -714,6 +1090,7 @@ async def scrape_youtube_chat(video_id: str):
         
         spam_count = 0
         msg_count = 0
+        empty_polls = 0
         
         while chat.is_alive():
             # Check if anyone is still watching
@@ -726,25 +1103,37 @@ async def scrape_youtube_chat(video_id: str):
                 client_count = len(video_clients.get(video_id, set()))
                 print(f"[Scraper] {video_id}: {msg_count} messages processed, {client_count} clients connected")
             
-            for c in chat.get().sync_items():
-                processed = process_message(c, state)
-                msg_count += 1
-                
-                spam_info = processed.get('spam', {})
+            batch = await asyncio.to_thread(poll_chat, chat, state)
+            empty_polls = 0 if batch else empty_polls + 1
+            msg_count += len(batch)
+            polled = []
+            suspects = []
+            for processed in batch:
+                spam_info = processed.spam
                 if spam_info.get('is_spam'):
                     spam_count += 1
                     continue
                 
                 if spam_info.get('confidence', 0) >= 0.5:
-                    if await llm_spam_check(processed['text']):
-                        spam_count += 1
-                        continue
-                
-                if processed['topic'] or processed['isQuestion']:
-                    await broadcast_to_video(video_id, {'type': 'message', 'data': processed})
-                
-                vibe_batch.append(processed)
-                state['pulse_buffer'].append(processed)
+                    suspects.append(processed)
+                polled.append(processed)
+            
+            # Borderline messages are checked together so the LLM sees them as one batch
+            if suspects:
+                verdicts = await asyncio.gather(*[llm_spam_check(p.text) for p in suspects])
+                rejected = {id(p) for p, is_spam in zip(suspects, verdicts) if is_spam}
+                spam_count += len(rejected)
+                polled = [p for p in polled if id(p) not in rejected]
+            
+            # The whole poll goes out as one frame
+            await broadcast_many_to_video(video_id, [
+                {'type': 'message', 'data': p.to_dict()}
+                for p in polled if p.topic or p.is_question
+            ])
+            
+            vibe_batch.extend(polled)
+            for processed in polled:
+                state.add_pulse_message(processed)
             
             current_time = asyncio.get_event_loop().time()
             
@@ -752,24 +1141,25 @@ async def scrape_youtube_chat(video_id: str):
             if current_time - last_vibe_check >= VIBE_CHECK_INTERVAL and vibe_batch:
                 if is_llm_available():
                     classified = await classify_vibe_batch(vibe_batch[-20:])
-                    for msg in classified:
-                        if msg.get('vibe'):
-                            await broadcast_to_video(video_id, {'type': 'vibe', 'data': msg})
+                    await broadcast_many_to_video(video_id, [
+                        {'type': 'vibe', 'data': msg.to_dict()}
+                        for msg in classified if msg.vibe
+                    ])
                 vibe_batch = []  # Clear batch either way to prevent memory growth
                 last_vibe_check = current_time
             
             # Pulse summary (skip if rate limited)
-            if current_time - last_pulse_time >= PULSE_INTERVAL and len(state['pulse_buffer']) >= 10:
+            if current_time - last_pulse_time >= PULSE_INTERVAL and len(state.pulse_buffer) >= 10:
                 if is_llm_available():
-                    pulse = await generate_pulse_summary(state['pulse_buffer'])
+                    pulse = await generate_pulse_summary(state)
                     if pulse:
                         await broadcast_to_video(video_id, {'type': 'pulse', 'data': pulse})
-                    state['pulse_buffer'] = []
+                    state.reset_pulse()
                     last_pulse_time = current_time
                 else:
                     # Still clear old buffer to prevent memory growth, but don't generate
-                    if len(state['pulse_buffer']) > PULSE_MESSAGE_WINDOW * 2:
-                        state['pulse_buffer'] = state['pulse_buffer'][-PULSE_MESSAGE_WINDOW:]
+                    if len(state.pulse_buffer) > PULSE_MESSAGE_WINDOW * 2:
+                        state.trim_pulse_buffer(PULSE_MESSAGE_WINDOW)
             
             # Check for rate limit status changes (every 10 seconds)
             if current_time - last_rate_limit_check >= 10:
@@ -783,7 +1173,8 @@ async def scrape_youtube_chat(video_id: str):
                     last_llm_available = current_llm_available
                 last_rate_limit_check = current_time
             
-            await asyncio.sleep(0.5)
+            delay = min(CHAT_POLL_MAX, CHAT_POLL_MIN * 2 ** min(empty_polls, 5)) if empty_polls else CHAT_POLL_MIN
+            await asyncio.sleep(delay)
             
     except Exception as e:
         print(f"[Scraper] Error for {video_id}: {e}")
@@ -806,7 +1197,7 @@ async def handle_client(websocket):
     print(f"[WS] Client {client_id} connected. Total clients: {len(connected_clients)}")
     
     try:
-        await websocket.send(json.dumps({
+        await websocket.send(json_text({
             'type': 'connected',
             'message': 'Connected to FlowState backend',
             'llm_available': is_llm_available(),
@@ -815,7 +1206,7 @@ async def handle_client(websocket):
         
         async for message in websocket:
             try:
-                data = json.loads(message)
+                data = json_parse(message)
                 msg_type = data.get('type')
                 
                 if msg_type == 'SUBSCRIBE':
@@ -843,12 +1234,12 @@ async def handle_client(websocket):
                             task = asyncio.create_task(scrape_youtube_chat(video_id))
                             active_scrapers[video_id] = task
                         
-                        await websocket.send(json.dumps({
+                        await websocket.send(json_text({
                             'type': 'subscribed',
                             'videoId': video_id
                         }))
                     else:
-                        await websocket.send(json.dumps({
+                        await websocket.send(json_text({
                             'type': 'error',
                             'message': 'Invalid video ID or URL'
                         }))
@@ -858,7 +1249,7 @@ async def handle_client(websocket):
                         video_clients[client_video_id].discard(websocket)
                         client_video_id = None
                         
-                        await websocket.send(json.dumps({
+                        await websocket.send(json_text({
                             'type': 'unsubscribed'
                         }))
                 
@@ -893,11 +1284,19 @@ async def main(video_url: str = None):
         task = asyncio.create_task(scrape_youtube_chat(video_id))
         active_scrapers[video_id] = task
     
-    async with serve(handle_client, "0.0.0.0", WEBSOCKET_PORT):
-        await asyncio.Future()  # Run forever
+    try:
+        async with serve(handle_client, "0.0.0.0", WEBSOCKET_PORT):
+            await asyncio.Future()  # Run forever
+    finally:
+        await llm_client.aclose()
 
 
 if __name__ == "__main__":
     import sys
     video_url = sys.argv[1] if len(sys.argv) > 1 else None
-    asyncio.run(main(video_url))
+    try:
+        import uvloop
+    except ImportError:
+        uvloop = None  # Optional - faster event loop (not available on Windows)
+    run = uvloop.run if uvloop else asyncio.run
+    run(main(video_url))
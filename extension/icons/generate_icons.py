@@ -2,66 +2,314 @@
 """
 Generate placeholder icons for the Chrome extension
 Run: python3 generate_icons.py
+Bake: python3 generate_icons.py --bake  (embeds the icons in _icons_baked.py)
 """
 
 import base64
+import hashlib
+import os
 import struct
+import sys
 import zlib
+from concurrent.futures import ThreadPoolExecutor
 
-def create_png(size, color=(59, 130, 246)):
-    """Create a simple solid-color PNG"""
+# Optional - vectorized pixel rendering
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Optional - libdeflate bindings, faster than stock zlib at equal ratio
+try:
+    import deflate
+except ImportError:
+    deflate = None
+
+# Optional - icons prebaked by --bake, written out as-is instead of encoded
+try:
+    import _icons_baked
+except ImportError:
+    _icons_baked = None
+
+COMPRESS_LEVEL = 6  # Level 9 is ~13x slower at 128px for ~3% smaller IDAT
+
+def _zlib_compress(data, level=COMPRESS_LEVEL):
+    """Compress scanlines into the zlib stream IDAT expects"""
+    if deflate is not None:
+        return deflate.zlib_compress(data, level)
+    return zlib.compress(data, level)
+
+ICON_SIZES = [16, 32, 48, 128]
+BAKED_MODULE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '_icons_baked.py')
+
+BIT_DEPTH = 2  # Palette indices packed 4 to a byte
+BPP = 1  # Filter stride: whole bytes per pixel, rounded up
+ICON_COLOR = (59, 130, 246)
+BORDER_COLOR = (30, 30, 40)
+BACKGROUND_COLOR = (15, 15, 25)
+
+# Palette indices
+INSIDE, BORDER, BACKGROUND = 0, 1, 2
+# Index by how many of the two circle edges a pixel lies beyond
+PIXELS = (INSIDE, BORDER, BACKGROUND)
+_PIX_BG = bytes([BACKGROUND])
+
+# Regenerate icons whenever this script changes, not just its parameters
+with open(__file__, 'rb') as _f:
+    GENERATOR_DIGEST = hashlib.sha256(_f.read()).hexdigest()
+
+def icon_tag(size, color=ICON_COLOR):
+    """Version tag stored in each icon's tEXt chunk"""
+    key = f'{GENERATOR_DIGEST}:{size}:{color}'.encode()
+    return hashlib.sha256(key).hexdigest()[:16]
+
+def read_png_text(filename):
+    """Return the tEXt key/value pairs of a PNG, or {} if it can't be read"""
+    try:
+        with open(filename, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return {}
     
-    def png_chunk(chunk_type, data):
-        chunk_len = len(data)
-        chunk = struct.pack('>I', chunk_len) + chunk_type + data
-        crc = zlib.crc32(chunk_type + data) & 0xffffffff
-        return chunk + struct.pack('>I', crc)
+    text = {}
+    pos = 8  # Skip the signature
+    while pos + 8 <= len(data):
+        chunk_len, chunk_type = struct.unpack_from('>I4s', data, pos)
+        if chunk_type == b'tEXt':
+            key, _, value = data[pos + 8:pos + 8 + chunk_len].partition(b'\x00')
+            text[key.decode('latin-1')] = value.decode('latin-1')
+        elif chunk_type in (b'IDAT', b'IEND'):
+            break  # Tags are written before the image data
+        pos += 12 + chunk_len
+    return text
+
+def _paeth(a, b, c):
+    """Paeth predictor: whichever neighbour is closest to a + b - c"""
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    if pb <= pc:
+        return b
+    return c
+
+def _filter_row_py(cur, prev, bpp=BPP):
+    """Pick the filter with the minimum sum of absolute differences"""
+    candidates = [bytearray(len(cur)) for _ in range(5)]
+    for i, x in enumerate(cur):
+        a = cur[i - bpp] if i >= bpp else 0
+        b = prev[i]
+        c = prev[i - bpp] if i >= bpp else 0
+        candidates[0][i] = x
+        candidates[1][i] = (x - a) & 0xff
+        candidates[2][i] = (x - b) & 0xff
+        candidates[3][i] = (x - (a + b) // 2) & 0xff
+        candidates[4][i] = (x - _paeth(a, b, c)) & 0xff
     
-    # PNG signature
-    signature = b'\x89PNG\r\n\x1a\n'
+    # Score each candidate with its bytes read as signed deltas
+    scores = [sum(v if v < 128 else 256 - v for v in cand) for cand in candidates]
+    filter_type = scores.index(min(scores))
+    return filter_type, bytes(candidates[filter_type])
+
+def _filter_rows(rows, bpp=BPP):
+    """Vectorized _filter_row_py over a whole uint8 image at once"""
+    # Every filter reads only unfiltered bytes, so each row's "above"
+    # neighbour is just the image shifted down by one row
+    x = rows.astype(np.int16)
+    a = np.zeros_like(x)
+    a[:, bpp:] = x[:, :-bpp]
+    b = np.zeros_like(x)
+    b[1:] = x[:-1]
+    c = np.zeros_like(x)
+    c[1:, bpp:] = x[:-1, :-bpp]
     
-    # IHDR chunk
-    width = height = size
-    bit_depth = 8
-    color_type = 2  # RGB
-    ihdr_data = struct.pack('>IIBBBBB', width, height, bit_depth, color_type, 0, 0, 0)
-    ihdr = png_chunk(b'IHDR', ihdr_data)
+    # Branchless Paeth: one pass of selects instead of per-byte branches
+    p = a + b - c
+    pa, pb, pc = np.abs(p - a), np.abs(p - b), np.abs(p - c)
+    paeth = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
     
-    # IDAT chunk (image data)
-    raw_data = b''
-    r, g, b = color
+    candidates = (np.stack([x, x - a, x - b, x - (a + b) // 2, x - paeth]) & 0xff).astype(np.uint8)
+    scores = np.abs(candidates.view(np.int8).astype(np.int32)).sum(axis=2)
+    filter_types = scores.argmin(axis=0).astype(np.uint8)
+    filtered = candidates[filter_types, np.arange(len(rows))]
+    return np.concatenate([filter_types[:, None], filtered], axis=1)
+
+def render_rows(size):
+    """Build the palette index rows pixel by pixel"""
+    width = height = size
+    cx, cy = size // 2, size // 2
+    radius = size * 0.4
+    r2, r2_border = radius ** 2, (radius + 2) ** 2
+    bg_row = _PIX_BG * width
+    rows = []
     for y in range(height):
-        raw_data += b'\x00'  # Filter type: none
-        for x in range(width):
+        # Start from a background row and only visit the circle's span,
+        # padded by a pixel so rounding can't clip the border
+        row = bytearray(bg_row)
+        dy = y - cy
+        half = int(max(r2_border - dy*dy, 0) ** 0.5) + 1
+        for x in range(max(cx - half, 0), min(cx + half + 1, width)):
             # Create a simple gradient circle
-            cx, cy = size // 2, size // 2
-            dx, dy = x - cx, y - cy
-            dist = (dx*dx + dy*dy) ** 0.5
-            radius = size * 0.4
+            dx = x - cx
+            d2 = dx*dx + dy*dy
             
-            if dist < radius:
+            if d2 < r2:
                 # Inside circle - blue
-                raw_data += bytes([r, g, b])
-            elif dist < radius + 2:
+                row[x] = INSIDE
+            elif d2 < r2_border:
                 # Border
-                raw_data += bytes([30, 30, 40])
-            else:
-                # Background - dark
-                raw_data += bytes([15, 15, 25])
+                row[x] = BORDER
+        rows.append(row)
+    return rows
+
+def render_rows_numpy(size):
+    """Build the palette index rows with a vectorized distance field"""
+    cx, cy = size // 2, size // 2
+    ys, xs = np.ogrid[:size, :size]
+    d2 = (xs - cx) ** 2 + (ys - cy) ** 2
+    radius = size * 0.4
     
-    compressed = zlib.compress(raw_data, 9)
-    idat = png_chunk(b'IDAT', compressed)
+    edges_crossed = (d2 >= radius ** 2).view(np.uint8) + (d2 >= (radius + 2) ** 2).view(np.uint8)
+    return np.array(PIXELS, np.uint8)[edges_crossed]
+
+def pack_rows(rows):
+    """Pack BIT_DEPTH-bit indices into bytes, leftmost pixel in the high bits"""
+    per_byte = 8 // BIT_DEPTH
+    
+    if np is not None:
+        height, width = rows.shape
+        padded = np.zeros((height, -(-width // per_byte) * per_byte), np.uint8)
+        padded[:, :width] = rows
+        groups = padded.reshape(height, -1, per_byte)
+        packed = np.zeros(groups.shape[:2], np.uint8)
+        for i in range(per_byte):
+            packed |= groups[:, :, i] << (8 - BIT_DEPTH * (i + 1))
+        return packed
+    
+    packed_rows = []
+    for row in rows:
+        packed = bytearray(-(-len(row) // per_byte))
+        for x, index in enumerate(row):
+            packed[x // per_byte] |= index << (8 - BIT_DEPTH * (x % per_byte + 1))
+        packed_rows.append(bytes(packed))
+    return packed_rows
+
+def unfiltered_scanlines(rows):
+    """Prefix every row with filter type 0 (None)"""
+    return b''.join(b'\x00' + bytes(row) for row in rows)
+
+def adaptive_scanlines(rows):
+    """Prefix every row with its minimum-sum-of-absolute-differences filter"""
+    if np is not None:
+        return _filter_rows(rows).tobytes()
+    
+    out = []
+    prev = bytes(len(rows[0]))
+    for cur in rows:
+        filter_type, filtered = _filter_row_py(cur, prev)
+        out.append(bytes([filter_type]))
+        out.append(bytes(filtered))
+        prev = cur
+    return b''.join(out)
+
+def encode_png(rows, width, palette, text=None):
+    """Encode packed palette index rows (bytes or a uint8 array) as a PNG file"""
+    
+    def png_chunk(chunk_type, data):
+        # Append length, type, data and CRC straight onto the output buffer
+        png.extend(struct.pack('>I', len(data)))
+        png.extend(chunk_type)
+        png.extend(data)
+        crc = zlib.crc32(data, zlib.crc32(chunk_type)) & 0xffffffff
+        png.extend(struct.pack('>I', crc))
+    
+    # PNG signature
+    png = bytearray(b'\x89PNG\r\n\x1a\n')
+    
+    # IHDR chunk
+    height = len(rows)
+    color_type = 3  # Indexed
+    ihdr_data = struct.pack('>IIBBBBB', width, height, BIT_DEPTH, color_type, 0, 0, 0)
+    png_chunk(b'IHDR', ihdr_data)
+    
+    # PLTE chunk
+    png_chunk(b'PLTE', b''.join(bytes(rgb) for rgb in palette))
+    
+    # tEXt chunks (metadata)
+    for key, value in (text or {}).items():
+        png_chunk(b'tEXt', key.encode('latin-1') + b'\x00' + value.encode('latin-1'))
+    
+    # IDAT chunk (image data)
+    # MSAD favours Up on near-identical rows, which flat art like this can
+    # compress worse than no filtering at all, so keep the smaller stream
+    compressed = min(
+        _zlib_compress(adaptive_scanlines(rows)),
+        _zlib_compress(unfiltered_scanlines(rows)),
+        key=len,
+    )
+    png_chunk(b'IDAT', compressed)
     
     # IEND chunk
-    iend = png_chunk(b'IEND', b'')
+    png_chunk(b'IEND', b'')
+    
+    return bytes(png)
+
+def create_png(size, color=ICON_COLOR):
+    """Create a simple solid-color PNG"""
+    if np is not None:
+        rows = render_rows_numpy(size)
+    else:
+        rows = render_rows(size)
+    palette = [color, BORDER_COLOR, BACKGROUND_COLOR]
+    return encode_png(pack_rows(rows), size, palette, {'gen': icon_tag(size, color)})
+
+def baked_png(size):
+    """Return the prebaked icon if it was baked by this exact script"""
+    if _icons_baked is None or _icons_baked.GENERATOR_DIGEST != GENERATOR_DIGEST:
+        return None
+    data = _icons_baked.ICONS.get(size)
+    return base64.b64decode(data) if data else None
+
+def build_png(size):
+    """Prebaked icon when available, otherwise a freshly encoded one"""
+    return baked_png(size) or create_png(size)
+
+def bake():
+    """Write every icon size into _icons_baked.py as Base64 literals"""
+    lines = [
+        '# Generated by generate_icons.py --bake - do not edit',
+        f'GENERATOR_DIGEST = {GENERATOR_DIGEST!r}',
+        'ICONS = {',
+    ]
+    for size in ICON_SIZES:
+        lines.append(f'    {size}: {base64.b64encode(create_png(size)).decode()!r},')
+    lines.append('}')
+    
+    with open(BAKED_MODULE, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
     
-    return signature + ihdr + idat + iend
+    print(f'Baked {len(ICON_SIZES)} icons into {BAKED_MODULE}')
 
 def main():
-    sizes = [16, 32, 48, 128]
+    if '--bake' in sys.argv[1:]:
+        bake()
+        return
+    
+    sizes = []
+    for size in ICON_SIZES:
+        filename = f'icon{size}.png'
+        if read_png_text(filename).get('gen') == icon_tag(size):
+            print(f'Up to date {filename}')
+        else:
+            sizes.append(size)
+    if not sizes:
+        return
+    
+    # Sizes are independent; NumPy and zlib release the GIL while encoding
+    with ThreadPoolExecutor(max_workers=len(sizes)) as executor:
+        icons = list(executor.map(build_png, sizes))
     
-    for size in sizes:
-        png_data = create_png(size)
+    for size, png_data in zip(sizes, icons):
         filename = f'icon{size}.png'
         
         with open(filename, 'wb') as f:
@@ -332,6 +332,10 @@ function handleChatData(data) {
         case 'message':
             processMessage(data.data);
             break;
+        case 'batch':
+            // Backend merges bursts into one frame
+            data.items.forEach(handleChatData);
+            break;
         case 'vibe':
             processVibe(data.data);
             break;
@@ -1560,6 +1560,11 @@ function handleMessage(msg) {
             document.getElementById('ticker-legend').style.display = 'flex';
             break;
             
+        case 'batch':
+            // Backend merges bursts into one frame
+            msg.items.forEach(handleMessage);
+            break;
+            
         case 'message':
             processMessage(msg.data);
             break;
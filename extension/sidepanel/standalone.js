@@ -452,6 +452,11 @@ function handleMessage(msg) {
             }
             break;
             
+        case 'batch':
+            // Backend merges bursts into one frame
+            msg.items.forEach(handleMessage);
+            break;
+            
         case 'message':
             processMessage(msg.data);
             break;